@@ -0,0 +1,154 @@
+"""Benchmarks for the compute paths: parsing, normalization, meals and
+recommendations, on seeded synthetic foods at several pantry sizes.
+
+Each operation reports its best time per call, throughput in foods per
+second and the peak memory it allocates (traced separately from the
+timing). Results can be saved as a baseline and later runs compared
+against it; the run fails if any operation's throughput drops by more
+than --tolerance.
+
+    python benchmarks/compute.py --save benchmarks/baseline.json
+    python benchmarks/compute.py --compare benchmarks/baseline.json
+    python benchmarks/compute.py --sizes 10 1000 --only recommend
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import noms
+from noms import analyze
+from noms.dict_parse import food_parse
+from synthetic import legacy_results, synthetic_foods
+
+SIZES = [10, 1000, 8000]
+
+
+def operations(size, seed):
+    """Return [(name, foods per call, fn)] for a pantry of size foods."""
+    food_data = synthetic_foods(size, seed)
+    legacy = legacy_results(food_data)
+    grams = [100] * size
+    foods = [noms.Food(data) for data in food_data]
+    pantry = analyze.pantry_matrix(foods)
+    meal = noms.Meal(foods[:3])
+    full_meal = noms.Meal(foods)
+    nutrient_dict = noms.nutrient_dict.nutrient_dict
+    return [
+        ("Food", size, lambda: [noms.Food(data) for data in food_data]),
+        ("food_parse", size, lambda: food_parse(legacy, nutrient_dict, grams)),
+        ("norm_rda", size, lambda: noms.norm_rda(pantry, nutrient_dict)),
+        ("Food.norm_rda", size, lambda: [food.norm_rda(nutrient_dict) for food in foods]),
+        ("Meal", size, lambda: noms.Meal(foods)),
+        ("generate_recommendations", size,
+         lambda: analyze.generate_recommendations(meal, foods, nutrient_dict, 10)),
+        ("recommend_removal", size, lambda: analyze.recommend_removal(full_meal, nutrient_dict)),
+    ]
+
+
+def best_time(fn, min_time, repeat):
+    """Best seconds per call over repeat rounds of at least min_time each."""
+    best = float("inf")
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = min(best, elapsed / calls)
+    return best
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def run(sizes, seed, only, min_time, repeat):
+    results = {}
+    for size in sizes:
+        for name, items, fn in operations(size, seed):
+            if only and not any(o in name for o in only):
+                continue
+            fn() # warm caches (nutrient views, rda vectors)
+            seconds = best_time(fn, min_time, repeat)
+            key = "%s[%d]" % (name, size)
+            results[key] = {
+                "seconds": seconds,
+                "items_per_second": items / seconds,
+                "peak_bytes": peak_memory(fn),
+            }
+            print("%-32s %12.1f foods/s %10.3f ms %9.2f MiB" % (
+                key, items / seconds, seconds * 1000, results[key]["peak_bytes"] / 2**20), flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print the change against baseline and return the regressed keys."""
+    regressions = []
+    print("\n%-32s %10s %10s" % ("vs baseline", "speed", "memory"))
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        speed = result["items_per_second"] / baseline[key]["items_per_second"]
+        memory = result["peak_bytes"] / max(baseline[key]["peak_bytes"], 1)
+        flag = ""
+        if speed < 1 - tolerance:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print("%-32s %9.2fx %9.2fx%s" % (key, speed, memory, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", help="run operations whose name contains one of these")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing round")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", help="write the results to this baseline file")
+    parser.add_argument("--compare", help="compare against this baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed fractional drop in throughput before failing")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.seed, args.only, args.min_time, args.repeat)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "seed": args.seed,
+                "results": results,
+            }, f, indent=2)
+        print("saved %s" % args.save)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("seed", args.seed) != args.seed:
+            print("WARNING: baseline was run with seed %s" % baseline["seed"])
+        if compare(results, baseline["results"], args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
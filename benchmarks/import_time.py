@@ -0,0 +1,98 @@
+"""Cold-start benchmark for `import noms`.
+
+Each sample runs a fresh interpreter. The run fails if importing noms loads
+a module that should only be imported on first use.
+
+numpy is the one heavy dependency noms needs at import, so the time budget
+is on what noms adds on top of `import numpy`, and scales with it: by
+default the overhead may be --max-ratio of numpy's own import time, which
+tracks the speed of the machine. Pass --max-ms for an absolute budget
+instead. Going over the budget fails the run; on a busy machine, where
+timings are noisy, --lenient reports it without failing.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 30 --max-ms 20
+"""
+
+import argparse
+import compileall
+import os
+import statistics
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules that `import noms` must leave for first use
+LAZY_MODULES = ["requests", "urllib3", "sqlite3", "asyncio", "aiohttp",
+                "scipy", "concurrent.futures", "pprint", "csv", "hashlib"]
+
+TIMER = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(','.join(m for m in {lazy!r} if m in sys.modules))
+"""
+
+
+def sample(module):
+    """Import module in a fresh interpreter, return (seconds, eager modules)."""
+    env = dict(os.environ, PYTHONPATH=REPO + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    out = subprocess.run([sys.executable, "-c", TIMER.format(module=module, lazy=LAZY_MODULES)],
+                         capture_output=True, text=True, check=True, env=env, cwd=REPO).stdout
+    elapsed, loaded = out.split("\n")[:2]
+    eager = [m for m in loaded.split(",") if m]
+    return float(elapsed), eager
+
+
+def measure(module, runs):
+    times = []
+    eager = set()
+    for _ in range(runs):
+        elapsed, loaded = sample(module)
+        times.append(elapsed)
+        eager.update(loaded)
+    return times, sorted(eager)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--max-ratio", type=float, default=0.5,
+                        help="maximum median import time added by noms, as a fraction of numpy's")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="absolute budget in ms, instead of --max-ratio")
+    parser.add_argument("--lenient", action="store_true",
+                        help="only warn when over the time budget (unexpected eager imports still fail)")
+    args = parser.parse_args(argv)
+
+    # installed packages ship bytecode, so measure with it compiled even when
+    # PYTHONDONTWRITEBYTECODE is set; one untimed run of each warms OS caches
+    compileall.compile_dir(os.path.join(REPO, "noms"), quiet=1)
+    sample("numpy")
+    sample("noms")
+    numpy_times, _ = measure("numpy", args.runs)
+    noms_times, eager = measure("noms", args.runs)
+
+    numpy_ms = statistics.median(numpy_times) * 1000
+    noms_ms = statistics.median(noms_times) * 1000
+    overhead = noms_ms - numpy_ms
+    budget = args.max_ms if args.max_ms is not None else args.max_ratio * numpy_ms
+    print("import numpy  median %7.1f ms  min %7.1f ms" % (numpy_ms, min(numpy_times) * 1000))
+    print("import noms   median %7.1f ms  min %7.1f ms" % (noms_ms, min(noms_times) * 1000))
+    print("noms overhead %7.1f ms (budget %.1f ms)" % (overhead, budget))
+
+    failed = False
+    if eager:
+        print("FAIL: import noms loaded %s" % ", ".join(eager))
+        failed = True
+    if overhead > budget:
+        print("%s: import overhead is over budget" % ("WARNING" if args.lenient else "FAIL"))
+        failed = failed or not args.lenient
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
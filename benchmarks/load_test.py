@@ -0,0 +1,117 @@
+"""Load test of noms.Client against the bundled fake FDC server.
+
+Starts a noms.fakeserver.FakeFDCServer on synthetic foods, then drives one
+shared Client from --concurrency threads with a mix of food(), foods() and
+foods_search() calls for --duration seconds. Reports calls and HTTP
+requests per second, latency percentiles per operation, and quota
+efficiency: foods delivered per request counted against the quota, and the
+share of requests the server throttled.
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --concurrency 16 --latency 0.05 --throttle-rate 0.02
+    python benchmarks/load_test.py --mix 1 0 0 --batch-window 0.005
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import noms
+from noms.fakeserver import FakeFDCServer
+from noms.ratelimit import RateLimiter
+from synthetic import WORDS, synthetic_foods
+
+OPERATIONS = ["food", "foods", "foods_search"]
+
+
+def worker(client, ids, mix, batch, deadline, seed, results):
+    rng = random.Random(seed)
+    while time.monotonic() < deadline:
+        op = rng.choices(OPERATIONS, weights=mix)[0]
+        start = time.perf_counter()
+        try:
+            if op == "food":
+                n = 1 if client.food(rng.choice(ids)) else 0
+            elif op == "foods":
+                n = len(client.foods(rng.sample(ids, batch)))
+            else:
+                n = len(client.foods_search(rng.choice(WORDS), pageSize=50) or [])
+        except Exception:
+            n = None # failed call
+        results.append((op, time.perf_counter() - start, n))
+
+
+def percentiles(latencies):
+    return np.percentile(np.array(latencies) * 1000, [50, 90, 99]).tolist() + [max(latencies) * 1000]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--foods", type=int, default=2000, help="foods served by the fake server")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--mix", type=float, nargs=3, default=[6, 3, 1],
+                        metavar=("FOOD", "FOODS", "SEARCH"), help="relative weights of each call")
+    parser.add_argument("--batch", type=int, default=40, help="fdcIds per foods() call")
+    parser.add_argument("--max-workers", type=int, default=4, help="Client max_workers")
+    parser.add_argument("--batch-window", type=float, default=None,
+                        help="Client batch_window, coalesces food() calls into /foods batches")
+    parser.add_argument("--latency", type=float, default=0.02, help="server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of random 429s")
+    parser.add_argument("--rate-limit", type=int, default=1000000, help="server quota per window")
+    parser.add_argument("--window", type=float, default=3600)
+    parser.add_argument("--burst", type=int, default=100, help="client limiter burst")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    food_data = synthetic_foods(args.foods, args.seed)
+    ids = [food["fdcId"] for food in food_data]
+    server = FakeFDCServer(food_data, latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit,
+                           window=args.window, throttle_rate=args.throttle_rate, seed=args.seed)
+    with server:
+        client = noms.Client("load-test", base_url=server.url, max_workers=args.max_workers,
+                             batch_window=args.batch_window,
+                             limiter=RateLimiter(args.rate_limit, window=args.window, burst=args.burst))
+        results = []
+        deadline = time.monotonic() + args.duration
+        threads = [threading.Thread(target=worker, args=(client, ids, args.mix, args.batch, deadline,
+                                                         args.seed + i, results))
+                   for i in range(args.concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stats = server.stats
+
+    requests_made = stats["requests"]
+    admitted = requests_made - stats["throttled"]
+    delivered = sum(n for _, _, n in results if n)
+    failed = sum(1 for _, _, n in results if n is None)
+    print("%d threads for %.1fs against %d foods, server latency %.0fms +%.0fms" % (
+        args.concurrency, elapsed, args.foods, args.latency * 1000, args.jitter * 1000))
+    print("calls          %8.1f /s  (%d, %d failed)" % (len(results) / elapsed, len(results), failed))
+    print("HTTP requests  %8.1f /s  (%d, %s)" % (requests_made / elapsed, requests_made,
+                                                ", ".join("%s %d" % e for e in sorted(stats["endpoints"].items()))))
+    print("foods          %8.1f /s  (%d)" % (delivered / elapsed, delivered))
+    print("\n%-14s %7s %9s %9s %9s %9s" % ("latency ms", "calls", "p50", "p90", "p99", "max"))
+    for op in OPERATIONS + ["all"]:
+        latencies = [t for o, t, _ in results if op in ("all", o)]
+        if latencies:
+            print("%-14s %7d %9.1f %9.1f %9.1f %9.1f" % ((op, len(latencies)) + tuple(percentiles(latencies))))
+    print("\nquota: %.2f foods per counted request, %d of %d requests throttled (%.1f%%)" % (
+        delivered / max(admitted, 1), stats["throttled"], requests_made,
+        100 * stats["throttled"] / max(requests_made, 1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Memory held by a whole catalogue of Food objects.
+
+Builds the SR Legacy sized synthetic catalogue from JSON, keeps only the
+Food objects, and reports the bytes retained per food as measured by
+tracemalloc. The dict-backed representation noms used to keep (the raw
+foodNutrients list and dict-backed portions) is measured alongside for
+comparison.
+
+    python benchmarks/memory.py
+    python benchmarks/memory.py --foods 1000
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import noms
+from synthetic import SR_FOODS, synthetic_foods
+
+
+class DictPortion:
+    def __init__(self, portion_data):
+        amount = float(portion_data.get('amount', 1))
+        self.weight = float(portion_data['gramWeight'])*amount
+        self.modifier = str(portion_data.get('modifier', ''))
+        self.unit = '(' + str(amount) + 'X) ' + str(portion_data['modifier'])
+
+
+class DictFood:
+    """Food as it was stored before nutrient vectors: the raw nutrient list."""
+    def __init__(self, food_data):
+        self.id = food_data['fdcId']
+        self.description = food_data['description']
+        self.nutrients = food_data['foodNutrients']
+        self.portions = [DictPortion(p) for p in food_data.get('foodPortions', [])]
+
+
+def retained(cls, bodies):
+    """Bytes still allocated after building cls from every JSON body."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    foods = [cls(json.loads(body)) for body in bodies]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del foods
+    return size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--foods", type=int, default=SR_FOODS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    bodies = [json.dumps(food) for food in synthetic_foods(args.foods, args.seed)]
+    print("%d foods" % args.foods)
+    results = [("dict-backed", retained(DictFood, bodies)),
+               ("noms.Food", retained(noms.Food, bodies))]
+    for name, size in results:
+        print("%-12s %8.1f MiB  %7.0f bytes/food" % (name, size / 2**20, size / args.foods))
+    print("reduction    %8.1fx" % (results[0][1] / results[1][1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Seeded synthetic FoodData Central records for the benchmarks.
+
+Foods are shaped like full-format /food responses for SR Legacy: around a
+hundred foodNutrients, each with a nested nutrient dict, and a few portions.
+The same seed always produces the same catalogue.
+"""
+
+import random
+
+from noms.nutrient_dict import nutrient_dict
+
+SR_FOODS = 7793  # size of the SR Legacy catalogue
+
+WORDS = ["apple", "beans", "beef", "bread", "broccoli", "butter", "cheese", "chicken",
+         "corn", "egg", "fish", "lentils", "milk", "oats", "onion", "pasta", "peas",
+         "pork", "potato", "rice", "salmon", "spinach", "tofu", "tomato", "yogurt"]
+STYLES = ["raw", "cooked", "boiled", "roasted", "canned", "frozen", "dried", "fresh",
+          "with salt", "without salt", "drained", "nfs"]
+MODIFIERS = ["cup", "tbsp", "tsp", "oz", "slice", "large", "medium", "small", "piece"]
+
+# tracked nutrients plus untracked ones, as the API returns both
+NUTRIENTS = [(str(n["nutrient_id"]), n["name"], n["unit"]) for n in nutrient_dict]
+NUTRIENTS += [(str(number), "Nutrient %s" % number, "mg") for number in range(501, 561)]
+
+
+def synthetic_food(rng, fdcId):
+    """Return one full-format food dict."""
+    description = "%s, %s, %s" % (rng.choice(WORDS).capitalize(), rng.choice(WORDS), rng.choice(STYLES))
+    food_nutrients = []
+    for i, (number, name, unit) in enumerate(rng.sample(NUTRIENTS, rng.randint(60, len(NUTRIENTS)))):
+        food_nutrients.append({
+            "type": "FoodNutrient",
+            "id": fdcId * 1000 + i,
+            "nutrient": {"id": 1000 + int(number), "number": number, "name": name,
+                         "rank": i * 100, "unitName": unit},
+            "amount": round(rng.uniform(0, 100), 3),
+        })
+    food_portions = []
+    for i in range(rng.randint(0, 5)):
+        modifier = rng.choice(MODIFIERS)
+        food_portions.append({
+            "id": fdcId * 10 + i,
+            "sequenceNumber": i + 1,
+            "amount": float(rng.randint(1, 3)),
+            "gramWeight": round(rng.uniform(5, 300), 1),
+            "modifier": modifier,
+            "portionDescription": "",
+            "measureUnit": {"id": 9999, "name": "undetermined"},
+        })
+    return {
+        "fdcId": fdcId,
+        "description": description,
+        "dataType": "SR Legacy",
+        "publicationDate": "4/1/2019",
+        "foodNutrients": food_nutrients,
+        "foodPortions": food_portions,
+    }
+
+
+def synthetic_foods(n, seed=0):
+    """Return n full-format food dicts generated from seed."""
+    rng = random.Random(seed)
+    return [synthetic_food(rng, 100000 + i) for i in range(n)]
+
+
+def legacy_results(foods):
+    """Convert full-format food dicts to the NDB report format read by
+    noms.dict_parse.food_parse."""
+    return {"foods": [{"food": {
+        "desc": {"ndbno": str(food["fdcId"]), "name": food["description"]},
+        "nutrients": [{"nutrient_id": fn["nutrient"]["number"], "value": fn["amount"]}
+                      for fn in food["foodNutrients"]],
+    }} for food in foods]}
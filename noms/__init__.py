@@ -1,19 +1,40 @@
 """Client class to interface with FoodData Central.
 FoodData Central requires a Data.gov key: https://api.data.gov/signup/
+
+requests, sqlite3, asyncio and thread pools are imported on first use, so
+`import noms` stays cheap for short-lived processes.
 """
 
+from array import array
+from collections import OrderedDict
 from enum import Enum
 import json
+import logging
+import os
+import sys
+import threading
 import time
-import requests
+import numpy as np
 
+from .errors import (FDCError, APIKeyError, CircuitOpenError, NotFoundError, RateLimitError,
+                     ServerError, error_for_status)
+from .metrics import Hooks, Metrics, endpoint_label
+from .ratelimit import RateLimiter, header_int
+from .retry import CircuitBreaker, RetryPolicy, parse_retry_after
+from .search_index import SearchIndex
+from .ingredients import match_portion, normalize_query, parse_ingredient, select_match
 
-import copy
-# from nutrient_dict import nutrient_dict, index_from_name
+from .nutrient_dict import nutrient_dict as _nutrient_dict, column_from_number, rda_limit_vectors
+from .profile import NutrientProfile, DEFAULT_PROFILE
 
-import pprint
+logger = logging.getLogger(__name__)
 
 BASE_URL = 'https://api.nal.usda.gov/fdc/v1'
+DEFAULT_TIMEOUT = 30.0 # seconds to wait for a response before retrying
+FOODS_BATCH_SIZE = 20 # maximum number of fdcIds accepted by /foods
+MAX_PAGE_SIZE = 200 # the API returns at most this many foods per page
+RESOLVE_MEMO_SIZE = 4096 # ingredient queries and foods memoized by resolve_ingredients
+LOCAL_INDEX_SIZE = 10000 # foods kept by the client's own index with search_index=True
 DATA_TYPES = [
     'Foundation',
     'SR Legacy',
@@ -64,44 +85,155 @@ def mergedicts(a, b, path=None):
     return a
 
 def norm_rda(nutrient_array, nutrient_dict, disp=False):
-    r_nut = copy.deepcopy(nutrient_array)
-    for ni, _ in enumerate(nutrient_dict):
-        norm_val = 0
-        if nutrient_dict[ni]['rda'] != None:
-            if r_nut[ni]['value'] < nutrient_dict[ni]['rda']:
-                # value is 5, rda is 15
-                # norm value is 5/15 = 0.33
-                r_nut[ni].update(to="rda")
-                norm_val = r_nut[ni]['value']/nutrient_dict[ni]['rda']
-            else:
-                # value is 30, rda is 15
-                # norm value is 1
-                r_nut[ni].update(to="rda")
-                norm_val = 1
-        if nutrient_dict[ni]['limit'] != None:
-            if r_nut[ni]['value'] > nutrient_dict[ni]['limit']:
-                r_nut[ni].update(to="limit")
-                norm_val = r_nut[ni]['value']/nutrient_dict[ni]['limit']
-            elif nutrient_dict[ni]['rda'] == None:
-                if disp:
-                    r_nut[ni].update(to="limit")
-                    norm_val = r_nut[ni]['value']/nutrient_dict[ni]['limit']
-                else:
-                    norm_val = 1
-        r_nut[ni].update(value=norm_val)
-        if 'measures' in r_nut[ni].keys():
-            del r_nut[ni]['measures']
-        del r_nut[ni]['unit']
+    """Normalize nutrient values against the RDAs and limits of nutrient_dict.
+    A value below its rda becomes the fraction of the rda met, and any value at
+    or above it becomes 1. A value over its limit becomes value/limit. For
+    nutrients with only a limit, values within it become 1, or value/limit
+    when disp is set.
+
+    nutrient_array may be a vector or a foods x nutrients matrix of values, in
+    which case an array of the same shape is returned, or a list of nutrient
+    dicts, in which case new dicts are returned with 'to' marking the bound
+    used and 'unit' dropped.
+    """
+    rda, limit = rda_limit_vectors(nutrient_dict)
+    if isinstance(nutrient_array, np.ndarray):
+        return norm_rda_values(nutrient_array, rda, limit, disp)
+
+    values = np.array([nutrient['value'] for nutrient in nutrient_array[:len(rda)]], dtype=float)
+    norm = norm_rda_values(values, rda, limit, disp)
+    over = values > limit
+    to_limit = over | (disp & np.isnan(rda) & ~np.isnan(limit))
+    r_nut = []
+    for ni, nutrient in enumerate(nutrient_array):
+        item = {k: v for k, v in nutrient.items() if k not in ('unit', 'measures')}
+        if ni < len(rda):
+            if to_limit[ni]:
+                item['to'] = "limit"
+            elif not np.isnan(rda[ni]):
+                item['to'] = "rda"
+            item['value'] = float(norm[ni])
+        r_nut.append(item)
     return r_nut
 
+def norm_rda_values(values, rda, limit, disp=False):
+    """Vectorized core of norm_rda. values is a vector or a matrix with one row
+    per food; rda and limit are vectors with NaN for missing bounds.
+    """
+    has_rda = ~np.isnan(rda)
+    has_limit = ~np.isnan(limit)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # value is 5, rda is 15 -> 0.33; value is 30, rda is 15 -> 1
+        norm = np.where(has_rda, np.where(values < rda, values / rda, 1.0), 0.0)
+        over = values > limit
+        norm = np.where(over, values / limit, norm)
+        within_limit_only = has_limit & ~has_rda & ~over
+        norm = np.where(within_limit_only, values / limit if disp else 1.0, norm)
+    return norm
+
+def foods_batches(fdcIds):
+    """Split fdcIds into de-duplicated batches small enough for /foods."""
+    unique_ids = {}
+    for fdcId in fdcIds:
+        unique_ids.setdefault(str(fdcId), fdcId)
+    unique_ids = list(unique_ids.values())
+    return [unique_ids[i:i+FOODS_BATCH_SIZE] for i in range(0, len(unique_ids), FOODS_BATCH_SIZE)]
+
+def foods_in_order(fdcIds, results):
+    """Build Food objects in the order of fdcIds from batches of raw food
+    dicts. Returns the foods and the IDs that were not found.
+    """
+    found = {}
+    for batch in results:
+        for food_data in batch:
+            found[str(food_data['fdcId'])] = food_data
+
+    foods = []
+    missing = []
+    for fdcId in fdcIds:
+        if str(fdcId) in found:
+            foods.append(Food(found[str(fdcId)]))
+        else:
+            missing.append(fdcId)
+    return foods, missing
+
+def nutrient_vector(food_nutrients):
+    """Return a float64 vector of nutrient values aligned to nutrient_dict
+    from any foodNutrients list the API returns (full, abridged or search
+    result format). Nutrients the food does not report are 0.
+    """
+    vector = np.zeros(len(_nutrient_dict))
+    for fn in food_nutrients:
+        if 'nutrient' in fn:            # full format
+            number = fn['nutrient'].get('number')
+            value = fn.get('amount')
+        elif 'number' in fn:            # abridged format
+            number = fn['number']
+            value = fn.get('amount')
+        elif 'nutrientNumber' in fn:    # search results
+            number = fn['nutrientNumber']
+            value = fn.get('value')
+        else:                           # legacy NDB format
+            number = fn.get('nutrient_id')
+            value = fn.get('value')
+        column = column_from_number.get(str(number))
+        if column is not None and value is not None:
+            vector[column] = value
+    return vector
+
+def nutrient_view(vector):
+    """Return the list-of-dicts view of a nutrient vector, one dict per
+    entry of nutrient_dict, as used before vectors were introduced.
+    """
+    view = []
+    for ni, nutrient in enumerate(_nutrient_dict):
+        view.append({
+            'nutrient_id': nutrient['nutrient_id'],
+            'name': nutrient.get('nickname', nutrient['name']),
+            'group': nutrient['group'],
+            'unit': nutrient['unit'],
+            'value': float(vector[ni])
+        })
+    return view
+
 class Portion:
+    __slots__ = ('weight', 'modifier', 'measure', 'amount')
+
     def __init__(self, portion_data):
         if 'amount' in portion_data.keys():
             amount = float(portion_data['amount'])
         else:
             amount = 1
+        # FDC's gramWeight is the weight of `amount` units; weight keeps the
+        # historical gramWeight * amount. Use gram_weight or unit_weight.
         self.weight = float(portion_data['gramWeight'])*amount
-        self.unit = '(' + str(amount) + 'X) ' + str(portion_data['modifier'])
+        self.modifier = sys.intern(str(portion_data.get('modifier', '')))
+        measure = portion_data.get('measureUnit', {}).get('name')
+        self.measure = None if measure is None else sys.intern(measure)
+        self.amount = amount
+
+    @classmethod
+    def from_values(cls, weight, modifier, measure, amount=1):
+        portion = cls.__new__(cls)
+        portion.weight = weight
+        portion.modifier = modifier
+        portion.measure = measure
+        portion.amount = amount
+        return portion
+
+    @property
+    def gram_weight(self):
+        """gramWeight as reported by FDC: grams in `amount` units."""
+        return self.weight / self.amount if self.amount else self.weight
+
+    @property
+    def unit_weight(self):
+        """Grams in one unit of the portion, e.g. one tbsp."""
+        return self.gram_weight / self.amount if self.amount else self.gram_weight
+
+    @property
+    def unit(self):
+        return '(' + str(self.amount) + 'X) ' + self.modifier
 
     def __str__(self):
         return self.unit + ' = ' + str(self.weight) + 'g'
@@ -110,14 +242,54 @@ class Portion:
         return "<Portion: " + self.__str__() + ">"
 
 class Food:
+    # Foods are held by the thousand, so they keep only the nutrient vector,
+    # an interned description and their portions packed into parallel arrays.
+    __slots__ = ('id', 'description', 'vector', '_nutrients',
+                 '_portion_weights', '_portion_amounts', '_portion_modifiers', '_portion_measures')
+
     def __init__(self, food_data):
         self.id = food_data['fdcId']
-        self.description = food_data["description"]
-        self.nutrients = food_data["foodNutrients"]
-        if 'foodPortions' in food_data.keys():
-            self.portions = [Portion(portion_data) for portion_data in food_data["foodPortions"]]
-        else:
-            self.portions = []
+        self.description = sys.intern(food_data["description"])
+        self.vector = nutrient_vector(food_data["foodNutrients"])
+        self._nutrients = None
+        self.portions = [Portion(portion_data) for portion_data in food_data.get("foodPortions", ())]
+
+    @classmethod
+    def from_vector(cls, fdcId, description, vector, portions=None):
+        """Build a Food directly from a nutrient vector aligned to nutrient_dict."""
+        food = cls.__new__(cls)
+        food.id = fdcId
+        food.description = sys.intern(description)
+        food.vector = np.asarray(vector, dtype=float)
+        food._nutrients = None
+        food.portions = portions
+        return food
+
+    @property
+    def portions(self):
+        """List of Portion objects, unpacked from the portion arrays."""
+        if self._portion_weights is None:
+            return []
+        return [Portion.from_values(*values) for values in zip(
+            self._portion_weights, self._portion_modifiers, self._portion_measures, self._portion_amounts)]
+
+    @portions.setter
+    def portions(self, portions):
+        if not portions:
+            self._portion_weights = self._portion_amounts = None
+            self._portion_modifiers = self._portion_measures = None
+            return
+        self._portion_weights = array('d', [p.weight for p in portions])
+        self._portion_amounts = array('d', [p.amount for p in portions])
+        self._portion_modifiers = tuple(p.modifier for p in portions)
+        self._portion_measures = tuple(p.measure for p in portions)
+
+    @property
+    def nutrients(self):
+        """List of nutrient dicts aligned to nutrient_dict, built on first use."""
+        if self._nutrients is None:
+            self._nutrients = nutrient_view(self.vector)
+        return self._nutrients
 
     def norm_rda(self, nutrient_dict):
         return norm_rda(self.nutrients, nutrient_dict)
@@ -129,20 +301,57 @@ class Food:
         return "<Food: " + self.description + " " + str(self.id) + ">"
     
 class Meal:
-    def __init__(self, foods):
-        self.foods = foods
-        self.nutrients = []
-        for nutrient in foods[0].nutrients:
-            to_app = nutrient.copy()
-            to_app["value"] = 0
-            self.nutrients.append(to_app)
-        for food in foods:
-            n = 0
-            for nutrient in food.nutrients:
-                self.nutrients[n]["value"] += nutrient["value"]
-                n += 1
-        for ni, _ in enumerate(self.nutrients):
-            self.nutrients[ni]["value"] = self.nutrients[ni]["value"]
+    def __init__(self, foods, grams=None):
+        """foods:: list of Food objects
+        grams:: optional list with the amount of each food. FDC values are per
+        100g, which is the default amount.
+        """
+        self.foods = []
+        self.grams = []
+        self._rows = []
+        self._matrix = None
+        self._nutrients = None
+        self.vector = np.zeros(len(_nutrient_dict))
+        for i, food in enumerate(foods):
+            self.add(food, 100 if grams is None else grams[i])
+
+    def add(self, food, grams=100):
+        """Add an amount of a food, updating the totals in place."""
+        row = food.vector * (grams / 100)
+        self.foods.append(food)
+        self.grams.append(grams)
+        self._rows.append(row)
+        self.vector += row
+        self._matrix = None
+        self._nutrients = None
+
+    def remove(self, i):
+        """Remove the food at index i, updating the totals in place. Returns
+        the removed food.
+        """
+        food = self.foods.pop(i)
+        self.grams.pop(i)
+        self.vector -= self._rows.pop(i)
+        if not self.foods:
+            self.vector[:] = 0 # drop any accumulated rounding error
+        self._matrix = None
+        self._nutrients = None
+        return food
+
+    @property
+    def matrix(self):
+        """foods x nutrients values for the amount of each food, one row per food."""
+        if self._matrix is None:
+            self._matrix = np.array(self._rows).reshape(len(self._rows), len(_nutrient_dict))
+        return self._matrix
+
+    @property
+    def nutrients(self):
+        """List of nutrient dicts aligned to nutrient_dict, built on first use."""
+        if self._nutrients is None:
+            self._nutrients = nutrient_view(self.vector)
+        return self._nutrients
+
     # def sort_by_top(self, n):
     #     ni = index_from_name(n)
     #     self.foods.sort(key=lambda f: f.nutrients[ni]["value"], reverse=True)
@@ -150,15 +359,67 @@ class Meal:
         return norm_rda(self.nutrients, nutrient_dict, disp)
 
 class Client:
-    def __init__(self, api_key="DEMO_KEY"):
+    def __init__(self, api_key="DEMO_KEY", cache=None, limiter=None, max_workers=4, search_index=None,
+                 base_url=BASE_URL, metrics=None, retry=None, breaker=None, batch_window=None,
+                 timeout=DEFAULT_TIMEOUT):
+        """cache:: optional ResponseCache (or a path to one) for persistent
+        reuse of food, foods and foods_search responses.
+        limiter:: optional RateLimiter. By default every Client with the same
+        key shares one limiter, which learns the real limit from the headers.
+        max_workers:: number of requests a single call may have in flight.
+        search_index:: optional SearchIndex, possibly shared, or True for one of
+        the client's own holding the last LOCAL_INDEX_SIZE foods. Every food
+        the client receives is added to it, so foods_search(local=True) can
+        answer from it. Off by default, as indexing costs time and memory
+        on every response.
+        base_url:: root of the FDC API, e.g. a noms.fakeserver.FakeFDCServer url
+        metrics:: optional Hooks (e.g. noms.Metrics) told about every request,
+        retry, rate limiter wait, quota update and cache lookup.
+        retry:: RetryPolicy for failed requests (noms.retry.NO_RETRY to disable).
+        breaker:: CircuitBreaker, may be shared between clients. Failed
+        requests raise FDCError subclasses from noms.errors.
+        batch_window:: seconds. If set, concurrent food() calls are coalesced:
+        calls for the same fdcId share one request, and distinct IDs asked for
+        within the window are fetched together by one /foods POST. See
+        noms.batching.
+        timeout:: seconds to wait for a response. A request that times out
+        counts as no response: it is retried and reported to the breaker.
+        """
         self.api_key = api_key
-
-        if api_key == "DEMO_KEY":
-            self.interval = 3600/30
-        else:
-            self.interval = 3600/1000 # API says it's rate limited at 1000 requests per hour, but the header says tells me 3600. TODO: dynamically get this by making a dummy request.
-
-        self.remaining_requests = 3600
+        self.base_url = base_url.rstrip('/')
+
+        if isinstance(cache, str):
+            from .cache import ResponseCache
+            cache = ResponseCache(cache)
+        self.cache = cache
+
+        self.limiter = limiter if limiter is not None else RateLimiter.for_key(api_key)
+        self.metrics = metrics if metrics is not None else Hooks()
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.timeout = timeout
+        self.max_workers = max_workers
+        if search_index is True:
+            search_index = SearchIndex(max_foods=LOCAL_INDEX_SIZE)
+        elif search_index is False:
+            search_index = None
+        self.search_index = search_index
+        self._lock = threading.Lock()
+        self._resolutions = OrderedDict() # (normalized query, data types) -> search result, LRU
+        self._resolved_foods = OrderedDict() # fdcId -> full-format Food, or None if not found, LRU
+
+        self._loader = None
+        if batch_window is not None:
+            from .batching import FoodLoader
+            self._loader = FoodLoader(self._food_batch, batch_window)
+
+    @property
+    def interval(self):
+        return self.limiter.interval
+
+    @property
+    def remaining_requests(self):
+        return self.limiter.remaining
 
     def process_args(self, **kwargs):
         """Process and validate arguments from any endpoint.
@@ -237,8 +498,8 @@ class Client:
         if 'pageSize' in kwargs:
             _pageSize = kwargs['pageSize']
             assert _pageSize >= 1, f"pageSize must be at least one. pageSize was {_pageSize}"
-            if _pageSize > 200:
-                print(f"Warning: maximum page size is 200. pageSize passed is {_pageSize}")
+            if _pageSize > MAX_PAGE_SIZE:
+                logger.warning("maximum page size is %s. pageSize passed is %s", MAX_PAGE_SIZE, _pageSize)
             data.update({'pageSize': _pageSize})
 
         if 'pageNumber' in kwargs:
@@ -258,60 +519,100 @@ class Client:
 
     def food(self,
              fdcId: str):
-        """Retrieves a single food item by an FDC ID.
+        """Retrieves a single food item by an FDC ID. Raises NotFoundError if
+        there is no such food.
             """
+        endpoint = "/food/" + str(fdcId)
 
-        if self.remaining_requests < 10:
-                time.sleep(self.interval)
-
-        for i in range(10):
-            if i == 1:
-                print("    (Trying to connect to API ", end="")
-            elif i > 1:
-                print(".", end="")
-                time.sleep(self.interval)
+        cached = self._cache_get(endpoint)
+        if cached is not None:
+            self._index_foods([cached])
+            return Food(cached)
 
-            response = self.api_get("/food/" + str(fdcId))
+        if self._loader is not None:
+            return Food(self._loader.load(fdcId))
 
-            obj = json.loads(response.text) if response.status_code == 200 else None
-
-            self.remaining_requests = int(response.headers["x-ratelimit-remaining"])
-            
-            if obj:
-                if i > 0: print(")")
-                return Food(obj)
-                
+        response = self.api_get(endpoint)
+        obj = json.loads(response.text)
+        self._cache_set(endpoint, None, response.text)
+        self._index_foods([obj])
         return Food(obj)
 
+    def _food_batch(self, fdcIds):
+        """Fetch full-format foods for the batch loader with one /foods POST,
+        caching each under its /food/{fdcId} endpoint as food() would.
+        """
+        data = self.process_args(fdcIds=fdcIds, format=Format.full, nutrients=None)
+        response = self.api_post(data, "/foods")
+        obj = json.loads(response.text)
+        if self.cache is not None:
+            for food_data in obj:
+                self._cache_set("/food/" + str(food_data['fdcId']), None, json.dumps(food_data))
+        self._index_foods(obj)
+        return obj
+
 
     def foods(self,
               fdcIds: list,
               format: Format=Format.abridged,
               nutrients: list=None):
-        
-        assert len(fdcIds) < 20, "Maximum number of foods for this endpoint is 20."
-
-        if self.remaining_requests < 10:
-                time.sleep(self.interval)
-        """Retrieves a list of food items by a list of up to 20 FDC IDs.
-        Optional format and nutrients can be specified. Invalid FDC ID's or ones
-        that are not found are omitted and an empty set is returned if there are
-        no matches.
+        """Retrieves a list of food items by a list of FDC IDs, in the order
+        requested. Optional format and nutrients can be specified. Invalid FDC
+        ID's or ones that are not found are omitted and an empty set is returned
+        if there are no matches. Use foods_bulk to also get the missing IDs.
             Endpoint: /foods
             Spec: https://fdc.nal.usda.gov/fdc_api.html#/FDC/postFoods
         """
+        return self.foods_bulk(fdcIds, format, nutrients)[0]
+
+    def foods_bulk(self,
+                   fdcIds: list,
+                   format: Format=Format.abridged,
+                   nutrients: list=None):
+        """Retrieves any number of foods by FDC ID. The IDs are split into
+        batches of FOODS_BATCH_SIZE which are sent concurrently by up to
+        max_workers threads, all sharing the client's rate limiter.
+        Returns a tuple of the Food objects in input order and the list of IDs
+        that were not found.
+        """
+        batches = foods_batches(fdcIds)
+
+        def fetch(batch):
+            return self._foods_batch(batch, format, nutrients)
+
+        if len(batches) > 1 and self.max_workers > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+                results = list(pool.map(fetch, batches))
+        else:
+            results = [fetch(batch) for batch in batches]
+
+        return foods_in_order(fdcIds, results)
+
+    def _foods_batch(self, fdcIds, format, nutrients):
+        """POST a single /foods batch, going through the cache. Returns the
+        raw food dicts.
+        """
+        assert len(fdcIds) <= FOODS_BATCH_SIZE, f"Maximum number of foods for this endpoint is {FOODS_BATCH_SIZE}."
+
         data = self.process_args(**{
             'fdcIds': fdcIds,
             'format': format,
             'nutrients': nutrients
         })
 
+        cached = self._cache_get("/foods", data)
+        if cached is not None:
+            self._index_foods(cached)
+            return cached
+
         response = self.api_post(data, "/foods")
-        obj = json.loads(response.text) if response.status_code == 200 else None
+        obj = json.loads(response.text)
+
+        self._cache_set("/foods", data, response.text)
+        self._index_foods(obj)
 
-        self.remaining_requests = int(response.headers["x-ratelimit-remaining"])
-        
-        return [Food(f) for f in obj]
+        return obj
 
     def foods_list(self,
                    dataTypes:list=[DataType.Foundation, DataType.SR, DataType.FNDDS],
@@ -331,47 +632,150 @@ class Client:
             'sortBy': sortBy,
             'reverse': reverse
         })
-        response = requests.post(
-            BASE_URL + '/foods/list',
-            params={'api_key': self.api_key},
-            json=data
-        )
-        obj = json.loads(response.text) if response.status_code == 200 else None
-        return response, obj
+        response = self.api_post(data, '/foods/list')
+        return response, json.loads(response.text)
+
+    def iter_foods(self,
+                   dataTypes:list=[DataType.Foundation, DataType.SR, DataType.FNDDS],
+                   pageSize:int=200,
+                   sortBy:Sorting=Sorting.fdcId,
+                   reverse=False,
+                   checkpoint:str=None):
+        """Lazily yields a Food for every item in the catalogue, walking
+        /foods/list page by page. Only the current page and the next one,
+        which is prefetched in the background, are held in memory.
+
+            checkpoint:: optional path of a JSON file recording the last page
+            that was completely yielded. An interrupted crawl started again
+            with the same checkpoint and arguments resumes after that page.
+            The file is removed once the crawl finishes.
+
+        pageSize may be at most MAX_PAGE_SIZE: the crawl ends at the first
+        short page, and the API never returns more.
+        """
+        if not 1 <= pageSize <= MAX_PAGE_SIZE:
+            raise ValueError("pageSize must be between 1 and %s, got %s" % (MAX_PAGE_SIZE, pageSize))
+        state = {
+            'dataTypes': [dt.value for dt in dataTypes],
+            'pageSize': pageSize,
+            'sortBy': sortBy.value,
+            'reverse': reverse,
+            'pageNumber': 0
+        }
+        if checkpoint is not None and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                saved = json.load(f)
+            if all(saved.get(k) == v for k, v in state.items() if k != 'pageNumber'):
+                state['pageNumber'] = saved['pageNumber']
+            else:
+                logger.warning("ignoring checkpoint %s written for different arguments", checkpoint)
+
+        def fetch(pageNumber):
+            response, obj = self.foods_list(dataTypes, pageSize, pageNumber, sortBy, reverse)
+            self._index_foods(obj)
+            return obj
+
+        from concurrent.futures import ThreadPoolExecutor
+        pool = ThreadPoolExecutor(max_workers=1)
+        try:
+            pageNumber = state['pageNumber'] + 1
+            future = pool.submit(fetch, pageNumber)
+            while True:
+                page = future.result()
+                if len(page) == pageSize:
+                    future = pool.submit(fetch, pageNumber + 1)
+                for food_data in page:
+                    yield Food(food_data)
+
+                if len(page) < pageSize:
+                    break
+                state['pageNumber'] = pageNumber
+                if checkpoint is not None:
+                    with open(checkpoint + '.tmp', 'w') as f:
+                        json.dump(state, f)
+                    os.replace(checkpoint + '.tmp', checkpoint)
+                pageNumber += 1
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        if checkpoint is not None and os.path.exists(checkpoint):
+            os.remove(checkpoint)
 
     def api_get(self, endpoint):
         """ send GET to API using standard configuration"""
-        headers = {'Content-Type': 'application/json'}
-
-        url = BASE_URL + endpoint + "?api_key=" + self.api_key
-
-        response = requests.get(url, headers=headers)
-
-        if response.status_code != 200:
-            if "Null key" not in response.text:
-                print("WARNING: response code %s" % response.status_code)
-                print(response.text)
-
-        return response    
+        return self._request('GET', endpoint)
 
     def api_post(self, data, endpoint):
         """ send POST to API using standard configuration"""
-        headers = {'Content-Type': 'application/json'}
-        
-        url = BASE_URL + endpoint + "?api_key=" + self.api_key
+        return self._request('POST', endpoint, data)
 
-        response = requests.post(
-            url,
-            headers=headers,
-            data=json.dumps(data)
-        )
+    def _request(self, method, endpoint, data=None):
+        """Send a request, retrying failures as the retry policy allows while
+        the circuit breaker is closed. Returns the successful response, or
+        raises the FDCError subclass for the last failure.
+        """
+        import requests
+        attempt = 0
+        while True:
+            attempt += 1
+            trial = self.breaker.before_request(endpoint)
+            try:
+                response = self._send(method, endpoint, data)
+                status, error = response.status_code, None
+            except requests.RequestException as e:
+                response, status, error = None, None, e
+            except BaseException:
+                self.breaker.release(trial)
+                raise
+            self.breaker.record(status, trial)
+            if status == 200:
+                return response
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+            delay = self.retry.delay(attempt, status, retry_after)
+            if delay is None:
+                raise error_for_status(status, endpoint, response.text if response is not None else None,
+                                       retry_after) from error
+            logger.info("retrying %s %s in %.2fs (attempt %s)", method, endpoint, delay, attempt + 1,
+                        extra={'endpoint': endpoint, 'status': status, 'attempt': attempt + 1})
+            self.metrics.retry(endpoint_label(endpoint), attempt, delay)
+            time.sleep(delay)
+
+    def _send(self, method, endpoint, data=None):
+        """Send a request once the rate limiter allows it, reporting it to
+        the metrics hooks and logging unsuccessful responses."""
+        import requests
+        headers = {'Content-Type': 'application/json'}
+        url = self.base_url + endpoint + "?api_key=" + self.api_key
+        label = endpoint_label(endpoint)
+
+        wait = self.limiter.acquire()
+        if wait > 0:
+            self.metrics.throttle(wait)
+        start = time.perf_counter()
+        try:
+            if method == 'GET':
+                response = requests.get(url, headers=headers, timeout=self.timeout)
+            else:
+                response = requests.post(url, headers=headers, data=json.dumps(data), timeout=self.timeout)
+        except requests.RequestException:
+            self.metrics.request(label, method, None, time.perf_counter() - start, 0)
+            raise
+        self.metrics.request(label, method, response.status_code, time.perf_counter() - start,
+                             len(response.content))
+        self.limiter.update(response.headers)
+        remaining = header_int(response.headers, 'x-ratelimit-remaining')
+        if remaining is not None:
+            self.metrics.quota(remaining, header_int(response.headers, 'x-ratelimit-limit') or None)
 
         if response.status_code != 200:
-            print("WARNING: response code %s" % response.status_code)
-            print(response.text)
+            if "Null key" not in response.text:
+                logger.warning("response code %s from %s %s", response.status_code, method, endpoint,
+                               extra={'endpoint': endpoint, 'status': response.status_code,
+                                      'body': response.text[:1000]})
 
         return response
-    
+
     def foods_search(self,
                      query: str,
                      dataTypes:list=[DataType.Foundation, DataType.SR, DataType.FNDDS],
@@ -381,9 +785,13 @@ class Client:
                      reverse=False,
                      brandOwner:str=None, 
                      getAll=False,
-                     exact=False):
+                     exact=False,
+                     local=False):
         """Search for foods using keywords. Results can be filtered by dataType
         and there are options for result page sizes or sorting.
+        With local, the query is answered from search_index, i.e. only from
+        foods this client has already seen, without a request. Results are then
+        always ranked by relevance.
             Endpoint: /foods/search
             Spec: https://fdc.nal.usda.gov/fdc_api.html#/FDC/postFoodsSearch
         """
@@ -400,43 +808,157 @@ class Client:
         # del data['dataType']
         # _json = {**data, 'dataType': dataType}
 
+        if local:
+            if self.search_index is None:
+                raise ValueError("foods_search(local=True) needs a client created with a search_index")
+            results = self.search_index.search(query, exact=exact, dataTypes=dataTypes)
+            if getAll or exact:
+                return results
+            return results[(pageNumber-1)*pageSize:pageNumber*pageSize]
+
         if exact: 
             getAll = True
             pageSize = 200
             data['pageSize'] = pageSize
 
         # pprint.pprint(data)
-        response = self.api_post(data, "/foods/search")
-
-        obj = json.loads(response.text) if response.status_code == 200 else None
+        obj = self._search_page(data)
+        assert obj is not None, "obj is unexpectedly None"
         if len(obj["foods"]) == 0:
-            print("WARNING: nothing found for query {%s}" % query)
+            logger.warning("nothing found for query {%s}", query)
 
-        if obj["totalPages"] > 1:
-            if getAll:
-                print("load all pages of %s" % obj["totalPages"])
-                page_data = copy.copy(data)
-                page_data['getAll'] = False
-                page_data['exactMatch'] = False
+        if obj["totalPages"] > 1 and getAll:
+            logger.info("load all pages of %s", obj["totalPages"])
+            page_data = [dict(data, pageNumber=i) for i in range(2, obj["totalPages"]+1)]
 
-                for i in range(2, obj["totalPages"]+1):
-                    page_data['pageNumber'] = i
-                    response = self.api_post(page_data, "/foods/search")
-                    next_page_obj = json.loads(response.text) if response.status_code == 200 else None
+            # pool.map keeps page order however the requests complete
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(page_data)))) as pool:
+                pages = list(pool.map(self._search_page, page_data))
 
-                    # pprint.pprint(next_page_obj.keys())
-                    del(next_page_obj["currentPage"])
-                    del(next_page_obj["foodSearchCriteria"])
-
-                    obj = mergedicts(obj, next_page_obj)
-
-        assert obj is not None, "obj is unexpectedly None"
+            for page in pages:
+                assert page is not None, "obj is unexpectedly None"
+                obj["foods"].extend(page["foods"])
 
         if exact:
             obj['foods'] = [f for f in obj["foods"] if query.lower() in f["description"].lower()]
 
         return [{'description': data['description'], 'fdcId': data['fdcId']} for data in obj['foods']]
 
+    def resolve_ingredients(self,
+                            lines: list,
+                            dataTypes:list=[DataType.Foundation, DataType.SR, DataType.FNDDS]):
+        """Resolve recipe ingredient lines such as "2 cups broccoli, raw" to
+        foods and gram amounts. Queries are normalized and de-duplicated across
+        the batch and memoized on the client, only unresolved ones are searched
+        (concurrently), and the matched foods are fetched in /foods batches to
+        find the portion named by each line.
+
+        Returns one dict per line with the line, query, amount, unit, fdcId,
+        description, portion and grams. fdcId is None for lines that matched
+        nothing, and grams is None when no portion fits the unit.
+        """
+        parsed = []
+        for line in lines:
+            amount, unit, name = parse_ingredient(line)
+            parsed.append((line, amount, unit, normalize_query(name)))
+
+        # a query resolves differently for different data types
+        types = tuple(sorted(dt.value for dt in dataTypes))
+        memoized = self._memo_get(self._resolutions, dict.fromkeys((q, types) for _, _, _, q in parsed))
+        resolutions = {q: match for (q, _), match in memoized.items()}
+        misses = list(dict.fromkeys(q for _, _, _, q in parsed if q not in resolutions))
+
+        def search(query):
+            data = self.process_args(**{
+                'query': query,
+                'dataTypes': dataTypes,
+                'pageSize': 50,
+                'pageNumber': 1,
+                'sortBy': Sorting.score,
+                'reverse': False
+            })
+            obj = self._search_page(data)
+            assert obj is not None, "obj is unexpectedly None"
+            return select_match(obj['foods'], query)
+
+        if misses:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(misses)))) as pool:
+                searched = dict(zip(misses, pool.map(search, misses)))
+            resolutions.update(searched)
+            self._memo_set(self._resolutions, {(q, types): match for q, match in searched.items()})
+
+        fdcIds = dict.fromkeys(m['fdcId'] for m in resolutions.values() if m is not None)
+        foods = self._memo_get(self._resolved_foods, fdcIds)
+        fdcIds = [i for i in fdcIds if i not in foods]
+        if fdcIds:
+            found, missing = self.foods_bulk(fdcIds, format=Format.full)
+            fetched = {food.id: food for food in found}
+            fetched.update(dict.fromkeys(missing)) # remembered as not found
+            foods.update(fetched)
+            self._memo_set(self._resolved_foods, fetched)
+
+        results = []
+        for line, amount, unit, query in parsed:
+            match = resolutions[query]
+            result = {'line': line, 'query': query, 'amount': amount, 'unit': unit,
+                      'fdcId': None, 'description': None, 'portion': None, 'grams': None}
+            if match is not None:
+                result.update(fdcId=match['fdcId'], description=match['description'])
+                if foods.get(match['fdcId']) is not None:
+                    result['portion'], result['grams'] = match_portion(foods[match['fdcId']], amount, unit)
+            results.append(result)
+        return results
+
+    def _index_foods(self, foods):
+        """Add foods to the search index, if the client keeps one."""
+        if self.search_index is not None:
+            self.search_index.add_foods(foods)
+
+    def _memo_get(self, memo, keys):
+        """Return the entries of an LRU memo that exist for keys."""
+        with self._lock:
+            hits = {}
+            for key in keys:
+                if key in memo:
+                    memo.move_to_end(key)
+                    hits[key] = memo[key]
+            return hits
+
+    def _memo_set(self, memo, items):
+        """Add items to an LRU memo, evicting the least recently used."""
+        with self._lock:
+            for key, value in items.items():
+                memo[key] = value
+                memo.move_to_end(key)
+            while len(memo) > RESOLVE_MEMO_SIZE:
+                memo.popitem(last=False)
+
+    def _search_page(self, data):
+        """POST a single /foods/search page, going through the cache."""
+        cached = self._cache_get("/foods/search", data)
+        if cached is not None:
+            self._index_foods(cached["foods"])
+            return cached
+
+        response = self.api_post(data, "/foods/search")
+        obj = json.loads(response.text)
+        self._cache_set("/foods/search", data, response.text)
+        self._index_foods(obj["foods"])
+        return obj
+
+    def _cache_get(self, endpoint, data=None):
+        if self.cache is None:
+            return None
+        cached = self.cache.get(endpoint, data)
+        self.metrics.cache(endpoint_label(endpoint), cached is not None)
+        return cached
+
+    def _cache_set(self, endpoint, data, body):
+        if self.cache is not None:
+            self.cache.set(endpoint, data, body)
+
     def pretty_print_results(self, foods):
         # dict_keys(['fdcId', 'description', 'dataType',
         # 'gtinUpc', 'publishedDate', 'brandOwner', 'ingredients', 'foodNutrients', 'allHighlightFields', 'score'])
@@ -444,6 +966,24 @@ class Client:
         for f in foods:
             print(f['description'] + " / " + f['dataType'] + " / " + str(f['fdcId']))
 
+# names exported from submodules that pull in heavier dependencies
+_LAZY_EXPORTS = {
+    'ResponseCache': '.cache',
+    'LocalClient': '.local',
+    'import_fdc': '.local',
+    'AsyncClient': '.aio',
+    'Snapshot': '.snapshot',
+    'export_snapshot': '.snapshot',
+}
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
 if __name__ == '__main__':
     client = Client("RcG9nFfxeyOhb94Vb3qktieFe07ulYbJwdh6kOj2")
 
@@ -0,0 +1,47 @@
+# Generated by `python -m noms.build_table` from nutrient_ids.json. Do not edit.
+TABLE_VERSION = 1
+SOURCE_SHA1 = '440a15666aa9d675f4e08ba309504085079eafec'
+PROFILE = (2000, 0.25, 0.5, 0.25, 0.1)
+nutrient_dict = [
+    {'nutrient_id': 203, 'name': 'Protein', 'group': 'Proximates', 'unit': 'g', 'rda': 125.0, 'limit': None},
+    {'nutrient_id': 204, 'name': 'Total lipid (fat)', 'group': 'Proximates', 'unit': 'g', 'nickname': 'Fat', 'rda': 55.56, 'limit': None},
+    {'nutrient_id': 205, 'name': 'Carbohydrate, by difference', 'group': 'Proximates', 'unit': 'g', 'nickname': 'Carbs', 'rda': 250.0, 'limit': None},
+    {'nutrient_id': 208, 'name': 'Energy', 'group': 'Proximates', 'unit': 'kcal', 'nickname': 'Calories', 'rda': 2000, 'limit': None},
+    {'nutrient_id': 255, 'name': 'Water', 'group': 'Proximates', 'unit': 'g', 'rda': 2000, 'limit': None},
+    {'nutrient_id': 262, 'name': 'Caffeine', 'group': 'Other', 'unit': 'mg', 'rda': None, 'limit': 400},
+    {'nutrient_id': 263, 'name': 'Theobromine', 'group': 'Other', 'unit': 'mg', 'rda': None, 'limit': 300},
+    {'nutrient_id': 269, 'name': 'Sugars, total', 'group': 'Proximates', 'unit': 'g', 'nickname': 'Sugar', 'rda': None, 'limit': 50.0},
+    {'nutrient_id': 291, 'name': 'Fiber, total dietary', 'group': 'Proximates', 'unit': 'g', 'nickname': 'Fiber', 'rda': 28.0, 'limit': None},
+    {'nutrient_id': 301, 'name': 'Calcium, Ca', 'group': 'Minerals', 'unit': 'mg', 'nickname': 'Calcium', 'rda': 1000, 'limit': 2500},
+    {'nutrient_id': 303, 'name': 'Iron, Fe', 'group': 'Minerals', 'unit': 'mg', 'nickname': 'Iron', 'rda': 8, 'limit': 45},
+    {'nutrient_id': 304, 'name': 'Magnesium, Mg', 'group': 'Minerals', 'unit': 'mg', 'nickname': 'Magnesium', 'rda': 300, 'limit': 700},
+    {'nutrient_id': 305, 'name': 'Phosphorus, P', 'group': 'Minerals', 'unit': 'mg', 'nickname': 'Phosphorus', 'rda': 700, 'limit': 4000},
+    {'nutrient_id': 306, 'name': 'Potassium, K', 'group': 'Minerals', 'unit': 'mg', 'nickname': 'Potassium', 'rda': 1400, 'limit': 6000},
+    {'nutrient_id': 307, 'name': 'Sodium, Na', 'group': 'Minerals', 'unit': 'mg', 'nickname': 'Sodium', 'rda': 1000, 'limit': 2300},
+    {'nutrient_id': 309, 'name': 'Zinc, Zn', 'group': 'Minerals', 'unit': 'mg', 'nickname': 'Zinc', 'rda': 12, 'limit': 100},
+    {'nutrient_id': 312, 'name': 'Copper, Cu', 'group': 'Minerals', 'unit': 'mg', 'nickname': 'Copper', 'rda': 0.9, 'limit': 10},
+    {'nutrient_id': 313, 'name': 'Fluoride, F', 'group': 'Minerals', 'unit': 'µg', 'nickname': 'Fluoride', 'rda': 400, 'limit': 10000},
+    {'nutrient_id': 315, 'name': 'Manganese, Mn', 'group': 'Minerals', 'unit': 'mg', 'nickname': 'Manganese', 'rda': 1.8, 'limit': None},
+    {'nutrient_id': 317, 'name': 'Selenium, Se', 'group': 'Minerals', 'unit': 'µg', 'nickname': 'Selenium', 'rda': 70, 'limit': 400},
+    {'nutrient_id': 318, 'name': 'Vitamin A, IU', 'group': 'Vitamins', 'unit': 'IU', 'nickname': 'Vitamin A', 'rda': 900, 'limit': 20000},
+    {'nutrient_id': 323, 'name': 'Vitamin E (alpha-tocopherol)', 'group': 'Vitamins', 'unit': 'mg', 'nickname': 'Vitamin E', 'rda': 15, 'limit': 1000},
+    {'nutrient_id': 324, 'name': 'Vitamin D', 'group': 'Vitamins', 'unit': 'IU', 'rda': 1000, 'limit': 8000},
+    {'nutrient_id': 401, 'name': 'Vitamin C, total ascorbic acid', 'group': 'Vitamins', 'unit': 'mg', 'nickname': 'Vitamin C', 'rda': 90, 'limit': 2000},
+    {'nutrient_id': 404, 'name': 'Thiamin', 'group': 'Vitamins', 'unit': 'mg', 'nickname': 'Vitamin B-1', 'rda': 1.2, 'limit': None},
+    {'nutrient_id': 405, 'name': 'Riboflavin', 'group': 'Vitamins', 'unit': 'mg', 'nickname': 'Vitamin B-2', 'rda': 1.3, 'limit': None},
+    {'nutrient_id': 406, 'name': 'Niacin', 'group': 'Vitamins', 'unit': 'mg', 'nickname': 'Vitamin B-3', 'rda': 16, 'limit': None},
+    {'nutrient_id': 410, 'name': 'Pantothenic acid', 'group': 'Vitamins', 'unit': 'mg', 'nickname': 'Vitamin B-5', 'rda': 4, 'limit': None},
+    {'nutrient_id': 415, 'name': 'Vitamin B-6', 'group': 'Vitamins', 'unit': 'mg', 'rda': 1.3, 'limit': 100},
+    {'nutrient_id': 417, 'name': 'Folate, total', 'group': 'Vitamins', 'unit': 'µg', 'nickname': 'Vitamin B-9', 'rda': 400, 'limit': 1000},
+    {'nutrient_id': 418, 'name': 'Vitamin B-12', 'group': 'Vitamins', 'unit': 'µg', 'rda': 2.4, 'limit': None},
+    {'nutrient_id': 421, 'name': 'Choline, total', 'group': 'Vitamins', 'unit': 'mg', 'nickname': 'Choline', 'rda': 550, 'limit': 3500},
+    {'nutrient_id': 430, 'name': 'Vitamin K (phylloquinone)', 'group': 'Vitamins', 'unit': 'µg', 'nickname': 'Vitamin K', 'rda': 120, 'limit': None},
+    {'nutrient_id': 601, 'name': 'Cholesterol', 'group': 'Lipids', 'unit': 'mg', 'rda': None, 'limit': 300},
+    {'nutrient_id': 605, 'name': 'Fatty acids, total trans', 'group': 'Lipids', 'unit': 'g', 'nickname': 'Trans Fat', 'rda': None, 'limit': 2.78},
+    {'nutrient_id': 606, 'name': 'Fatty acids, total saturated', 'group': 'Lipids', 'unit': 'g', 'nickname': 'Saturated Fat', 'rda': None, 'limit': 16.67},
+    {'nutrient_id': 621, 'name': '22:6 n-3 (DHA)', 'group': 'Lipids', 'unit': 'g', 'nickname': 'DHA', 'rda': 0.5, 'limit': None},
+    {'nutrient_id': 629, 'name': '20:5 n-3 (EPA)', 'group': 'Lipids', 'unit': 'g', 'nickname': 'EPA', 'rda': 0.5, 'limit': None},
+    {'nutrient_id': 645, 'name': 'Fatty acids, total monounsaturated', 'group': 'Lipids', 'unit': 'g', 'nickname': 'Monounsaturated Fat', 'rda': 22.22, 'limit': None},
+    {'nutrient_id': 646, 'name': 'Fatty acids, total polyunsaturated', 'group': 'Lipids', 'unit': 'g', 'nickname': 'Polyunsaturated Fat', 'rda': 16.67, 'limit': None},
+    {'nutrient_id': 851, 'name': '18:3 n-3 c,c,c (ALA)', 'group': 'Lipids', 'unit': 'g', 'nickname': 'ALA', 'rda': 0.6, 'limit': None},
+]
@@ -0,0 +1,326 @@
+"""asyncio client for FoodData Central.
+AsyncClient mirrors noms.Client but sends requests through a pooled aiohttp
+session, so hundreds of lookups can be in flight without blocking the loop.
+Response cache lookups, which are SQLite calls, run in the loop's default
+executor for the same reason. Requires aiohttp: pip install noms[async]
+"""
+
+import asyncio
+import json
+import time
+
+from . import (BASE_URL, DEFAULT_TIMEOUT, LOCAL_INDEX_SIZE, Client, DataType, Food, Format, Sorting,
+               foods_batches, foods_in_order, logger)
+from .cache import ResponseCache
+from .errors import error_for_status
+from .metrics import Hooks, endpoint_label
+from .ratelimit import RateLimiter, header_int
+from .retry import CircuitBreaker, RetryPolicy, parse_retry_after
+from .search_index import SearchIndex
+
+
+class AsyncClient:
+    """Async counterpart of noms.Client. Use it as an async context manager,
+    or call close() when done, to release the HTTP session.
+
+        max_connections:: size of the connection pool, and so the number of
+        requests in flight at once. The rate limiter is shared with any
+        synchronous Client using the same key.
+        base_url:: root of the FDC API, as for Client
+        metrics:: optional Hooks (e.g. noms.Metrics), as for Client
+        retry:: RetryPolicy, as for Client
+        breaker:: CircuitBreaker, as for Client. Failed requests raise
+        FDCError subclasses from noms.errors.
+        batch_window:: seconds, coalesces concurrent food() calls into /foods
+        batches, as for Client
+        timeout:: seconds per request, as for Client
+        search_index:: SearchIndex or True, as for Client, for
+        foods_search(local=True)
+    """
+    process_args = Client.process_args
+
+    def __init__(self, api_key="DEMO_KEY", cache=None, limiter=None, max_connections=20, base_url=BASE_URL,
+                 metrics=None, retry=None, breaker=None, batch_window=None, timeout=DEFAULT_TIMEOUT,
+                 search_index=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+
+        if isinstance(cache, str):
+            cache = ResponseCache(cache)
+        self.cache = cache
+
+        self.limiter = limiter if limiter is not None else RateLimiter.for_key(api_key)
+        self.metrics = metrics if metrics is not None else Hooks()
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._session = None
+
+        if search_index is True:
+            search_index = SearchIndex(max_foods=LOCAL_INDEX_SIZE)
+        elif search_index is False:
+            search_index = None
+        self.search_index = search_index
+
+        self._loader = None
+        if batch_window is not None:
+            from .batching import AsyncFoodLoader
+            self._loader = AsyncFoodLoader(self._food_batch, batch_window)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def session(self):
+        """Return the pooled aiohttp session, creating it on first use."""
+        if self._session is None:
+            try:
+                import aiohttp
+            except ImportError:
+                raise ImportError("noms.AsyncClient requires aiohttp: pip install aiohttp")
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                headers={'Content-Type': 'application/json'}
+            )
+        return self._session
+
+    async def _request(self, method, endpoint, data=None):
+        """Send a request, retrying failures as the retry policy allows while
+        the circuit breaker is closed. Returns the status code (200) and the
+        response text, or raises the FDCError subclass for the last failure.
+        """
+        import aiohttp
+        attempt = 0
+        while True:
+            attempt += 1
+            trial = self.breaker.before_request(endpoint)
+            try:
+                status, text, headers = await self._send(method, endpoint, data)
+                error = None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, text, headers, error = None, None, {}, e
+            except BaseException:
+                # cancelled, or failed for a reason that says nothing about the API
+                self.breaker.release(trial)
+                raise
+            self.breaker.record(status, trial)
+            if status == 200:
+                return status, text
+
+            retry_after = parse_retry_after(headers.get('Retry-After'))
+            delay = self.retry.delay(attempt, status, retry_after)
+            if delay is None:
+                raise error_for_status(status, endpoint, text, retry_after) from error
+            logger.info("retrying %s %s in %.2fs (attempt %s)", method, endpoint, delay, attempt + 1,
+                        extra={'endpoint': endpoint, 'status': status, 'attempt': attempt + 1})
+            self.metrics.retry(endpoint_label(endpoint), attempt, delay)
+            await asyncio.sleep(delay)
+
+    async def _send(self, method, endpoint, data=None):
+        """Send a request once the rate limiter allows it. Returns the status
+        code, the response text and the response headers.
+        """
+        label = endpoint_label(endpoint)
+        wait = self.limiter.reserve()
+        if wait > 0:
+            self.metrics.throttle(wait)
+        await asyncio.sleep(wait)
+        start = time.perf_counter()
+        try:
+            async with self.session().request(
+                method,
+                self.base_url + endpoint,
+                params={'api_key': self.api_key},
+                data=json.dumps(data) if data is not None else None
+            ) as response:
+                body = await response.read()
+        except Exception:
+            self.metrics.request(label, method, None, time.perf_counter() - start, 0)
+            raise
+        text = body.decode(response.get_encoding())
+        self.metrics.request(label, method, response.status, time.perf_counter() - start, len(body))
+        self.limiter.update(response.headers)
+        remaining = header_int(response.headers, 'x-ratelimit-remaining')
+        if remaining is not None:
+            self.metrics.quota(remaining, header_int(response.headers, 'x-ratelimit-limit') or None)
+
+        if response.status != 200:
+            if "Null key" not in text:
+                logger.warning("response code %s from %s %s", response.status, method, endpoint,
+                               extra={'endpoint': endpoint, 'status': response.status, 'body': text[:1000]})
+
+        return response.status, text, response.headers
+
+    async def _cache_get(self, endpoint, data=None):
+        """Look a request up in the cache without blocking the loop."""
+        if self.cache is None:
+            return None
+        loop = asyncio.get_running_loop()
+        cached = await loop.run_in_executor(None, self.cache.get, endpoint, data)
+        self.metrics.cache(endpoint_label(endpoint), cached is not None)
+        return cached
+
+    async def _cache_set(self, items):
+        """Store [(endpoint, data, body)] in the cache without blocking the loop."""
+        if self.cache is None:
+            return
+        def store():
+            for endpoint, data, body in items:
+                self.cache.set(endpoint, data, body)
+        await asyncio.get_running_loop().run_in_executor(None, store)
+
+    def _index_foods(self, foods):
+        if self.search_index is not None:
+            self.search_index.add_foods(foods)
+
+    async def _cached_request(self, method, endpoint, data=None):
+        """Like _request but answered from the cache when possible. Returns the
+        decoded object.
+        """
+        cached = await self._cache_get(endpoint, data)
+        if cached is not None:
+            return cached
+
+        status, text = await self._request(method, endpoint, data)
+        await self._cache_set([(endpoint, data, text)])
+        return json.loads(text)
+
+    async def food(self,
+                   fdcId: str):
+        """Retrieves a single food item by an FDC ID. Raises NotFoundError if
+        there is no such food."""
+        endpoint = "/food/" + str(fdcId)
+        if self._loader is not None:
+            obj = await self._cache_get(endpoint)
+            if obj is None:
+                obj = await self._loader.load(fdcId)
+        else:
+            obj = await self._cached_request('GET', endpoint)
+        self._index_foods([obj])
+        return Food(obj)
+
+    async def _food_batch(self, fdcIds):
+        """Fetch full-format foods for the batch loader with one /foods POST."""
+        data = self.process_args(fdcIds=fdcIds, format=Format.full, nutrients=None)
+        status, text = await self._request('POST', "/foods", data)
+        obj = json.loads(text)
+        if self.cache is not None:
+            await self._cache_set([("/food/" + str(food_data['fdcId']), None, json.dumps(food_data))
+                                   for food_data in obj])
+        return obj
+
+    async def foods(self,
+                    fdcIds: list,
+                    format: Format=Format.abridged,
+                    nutrients: list=None):
+        """Retrieves a list of food items by any number of FDC IDs, in the
+        order requested. IDs that are not found are omitted.
+        """
+        return (await self.foods_bulk(fdcIds, format, nutrients))[0]
+
+    async def foods_bulk(self,
+                         fdcIds: list,
+                         format: Format=Format.abridged,
+                         nutrients: list=None):
+        """Retrieves foods in concurrent /foods batches. Returns the Food
+        objects in input order and the list of IDs that were not found.
+        """
+        async def fetch(batch):
+            data = self.process_args(**{
+                'fdcIds': batch,
+                'format': format,
+                'nutrients': nutrients
+            })
+            obj = await self._cached_request('POST', "/foods", data)
+            self._index_foods(obj)
+            return obj
+
+        results = await asyncio.gather(*[fetch(batch) for batch in foods_batches(fdcIds)])
+        return foods_in_order(fdcIds, results)
+
+    async def foods_list(self,
+                         dataTypes:list=[DataType.Foundation, DataType.SR, DataType.FNDDS],
+                         pageSize:int=50,
+                         pageNumber:int=1,
+                         sortBy:Sorting=Sorting.dataType,
+                         reverse=False):
+        """Retrieves a paged list of foods. Returns the status code and the
+        decoded page.
+        """
+        data = self.process_args(**{
+            'dataTypes': dataTypes,
+            'pageSize': pageSize,
+            'pageNumber': pageNumber,
+            'sortBy': sortBy,
+            'reverse': reverse
+        })
+        status, text = await self._request('POST', '/foods/list', data)
+        obj = json.loads(text)
+        self._index_foods(obj)
+        return status, obj
+
+    async def foods_search(self,
+                           query: str,
+                           dataTypes:list=[DataType.Foundation, DataType.SR, DataType.FNDDS],
+                           pageSize:int=10,
+                           pageNumber:int=1,
+                           sortBy:Sorting=Sorting.score,
+                           reverse=False,
+                           brandOwner:str=None,
+                           getAll=False,
+                           exact=False,
+                           local=False):
+        """Search for foods using keywords. With getAll, every remaining page
+        is fetched concurrently once the number of pages is known. With local,
+        the query is answered from search_index without a request, as for
+        Client.foods_search.
+        """
+        data = self.process_args(**{
+            'query': query,
+            'dataTypes': dataTypes,
+            'pageSize': pageSize,
+            'pageNumber': pageNumber,
+            'sortBy': sortBy,
+            'reverse': reverse,
+            'brandOwner': brandOwner
+        })
+
+        if local:
+            if self.search_index is None:
+                raise ValueError("foods_search(local=True) needs a client created with a search_index")
+            results = self.search_index.search(query, exact=exact, dataTypes=dataTypes)
+            if getAll or exact:
+                return results
+            return results[(pageNumber-1)*pageSize:pageNumber*pageSize]
+
+        if exact:
+            getAll = True
+            data['pageSize'] = 200
+
+        obj = await self._cached_request('POST', "/foods/search", data)
+        assert obj is not None, "obj is unexpectedly None"
+
+        foods = obj["foods"]
+        if getAll and obj["totalPages"] > 1:
+            pages = []
+            for i in range(2, obj["totalPages"]+1):
+                page_data = dict(data, pageNumber=i)
+                pages.append(self._cached_request('POST', "/foods/search", page_data))
+            for page in await asyncio.gather(*pages):
+                assert page is not None, "obj is unexpectedly None"
+                foods.extend(page["foods"])
+
+        self._index_foods(foods)
+        if exact:
+            foods = [f for f in foods if query.lower() in f["description"].lower()]
+
+        return [{'description': f['description'], 'fdcId': f['fdcId']} for f in foods]
@@ -1,48 +1,84 @@
-from scipy.optimize import minimize
-from . import Meal
-import copy 
 import sys
-import os
+
+import numpy as np
+
+from . import Meal, norm_rda, nutrient_view
+from .nutrient_dict import nutrient_ids, rda_limit_vectors
+
+# bounds on the scale applied to a 100g pantry food
+K_MIN = 0.05
+K_MAX = sys.maxsize
+
+def pantry_matrix(pantry):
+    """ Returns a foods x nutrients matrix for a list of Food objects. A matrix
+    passed in is returned unchanged. """
+    if isinstance(pantry, np.ndarray):
+        return pantry
+    return np.array([food.vector for food in pantry]).reshape(len(pantry), len(nutrient_ids))
+
+def deficit_vector(meal, nutrient_dict):
+    """ Returns, per nutrient, the fraction by which the meal misses its
+    target: 0 is full satisfaction and 1 is no satisfaction. Values over a
+    limit give negative deficits. """
+    return 1 - norm_rda(meal.vector, nutrient_dict)
 
 def norm_rda_deficit(norm_rda_arr):
     """ Returns a modified list of nutrient dicts in which value represents 
     a fraction of how much a given nutrient has been satisfied. A value of
     0 represents full satisfaction, and 1 represents no satisfaction. """
-    r_nut = copy.deepcopy(norm_rda_arr)
-    for ni, _ in enumerate(r_nut):
-        r_nut[ni]['value'] = 1 - r_nut[ni]['value']
-    return r_nut
+    return [dict(nut, value=1 - nut['value']) for nut in norm_rda_arr]
 
 def loss(meal, nutrient_dict, verbose=False):
+    deficit = deficit_vector(meal, nutrient_dict)
     if verbose:
         print("Deficit breakdown of meal:")
-    deficit = norm_rda_deficit(meal.norm_rda(nutrient_dict))
-    loss = 0; ni = 0
-    for nut in deficit:
-        if verbose:
-            print("{nut:<20}: {val:>10} percent unmet".format(nut=nut['name'], val=round(nut['value'] * 100, 1)))
-        loss += nut['value'] ** 2
-        ni += 1
-    return loss
+        for nut, val in zip(nutrient_view(deficit), deficit):
+            print("{nut:<20}: {val:>10} percent unmet".format(nut=nut['name'], val=round(val * 100, 1)))
+    return float(deficit @ deficit)
 
 def best_contributors(k, meal, suggestion, nutrient_dict, x):
     """
     Returns the top nutrients that are being satisfied by a give suggestion
     """
-    sug_norm = suggestion.norm_rda(nutrient_dict)
-    sug_norm = copy.deepcopy(sug_norm)
+    sug_norm = norm_rda(suggestion.vector, nutrient_dict) * k
+    req = deficit_vector(meal, nutrient_dict)
+    names = [nut['name'] for nut in nutrient_view(req)]
     nutrient_residuals = []
-    req = norm_rda_deficit(meal.norm_rda(nutrient_dict))
-    ni = 0
-    for nut in sug_norm:
-        nut['value'] *= k
-        this_nutrient_required = req[ni]['value']
-        if this_nutrient_required > 0:
-            resid = abs((this_nutrient_required ** 2) - ((nut['value']-this_nutrient_required) ** 2))
-            nutrient_residuals.append(dict(value=resid, name=nut['name']))
-        ni += 1
+    for ni in np.flatnonzero(req > 0):
+        resid = abs((req[ni] ** 2) - ((sug_norm[ni] - req[ni]) ** 2))
+        nutrient_residuals.append(dict(value=float(resid), name=names[ni]))
     return sorted(nutrient_residuals, key=lambda x: x['value'], reverse=True)[:x]
 
+def score_pantry(meal, pantry, nutrient_dict):
+    """
+    Finds, for every pantry food at once, the scale k (in units of 100g) that
+    minimizes the squared residual between the food's normed nutrients and
+    what the meal still requires, and the loss at that scale.
+
+    The normed nutrients of a food scale linearly with k, so for each food
+    the loss is a quadratic a*k^2 - 2*b*k + c. Its minimum is at k = b/a,
+    clipped to [K_MIN, K_MAX]. Nutrients that are not required and have no
+    limit are superfluous and not counted.
+
+    Returns a tuple of loss and k arrays, one entry per pantry food.
+    """
+    required = deficit_vector(meal, nutrient_dict)
+    _, limit = rda_limit_vectors(nutrient_dict)
+    tracked = ~((required == 0) & np.isnan(limit))
+    required = np.where(tracked, required, 0.0)
+
+    normed = norm_rda(pantry_matrix(pantry), nutrient_dict)
+    a = (normed * normed) @ tracked
+    b = normed @ required
+    c = required @ required
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # a food with nothing to contribute has a flat loss; keep k at 1
+        k = np.where(a > 0, b / a, 1.0)
+    k = np.clip(k, K_MIN, K_MAX)
+    losses = a * k * k - 2 * b * k + c
+    return losses, k
+
 def suggestion_loss(meal, suggestion, nutrient_dict, verbose=False):
     """
     Minimizes the squared residual of each normed nutrient for a given
@@ -50,39 +86,21 @@ def suggestion_loss(meal, suggestion, nutrient_dict, verbose=False):
     find the best food recommendation for a given meal in the context
     of a nutrient_dict
     """
-    def scaled_loss(k, *args):
-        sug_norm = args[1].norm_rda(args[2])
-        sug_norm = copy.deepcopy(sug_norm)
-        loss = 0; ni = 0
-        for nut in sug_norm:
-            nut['value'] *= k
-            this_nutrient_required = args[0][ni]['value']
-            # don't track it as loss if it's superfluous
-            # i.e. its not required but there is no limit
-            if not (this_nutrient_required == 0 and nutrient_dict[ni]['limit'] == None):
-                '''if 'nickname' in nutrient_dict[ni].keys() and nutrient_dict[ni]['nickname'] == "Sugar":
-                    loss += ((nut['value'] - this_nutrient_required) ** 2) * 3
-                elif not nutrient_dict[ni]['group'] == "Proximates":
-                    loss += (nut['value'] - this_nutrient_required) ** 2'''
-                #if not (nutrient_dict[ni]['name'] == "Sugars, total"):
-                loss += (nut['value'] - this_nutrient_required) ** 2
-            ni += 1
-        return loss
-    required_normed_nutrients = norm_rda_deficit(meal.norm_rda(nutrient_dict))
-    sol = minimize(scaled_loss, 1, args=(required_normed_nutrients, suggestion, nutrient_dict), bounds=[(0.05, sys.maxsize)], tol=1e-2)
+    losses, ks = score_pantry(meal, [suggestion], nutrient_dict)
     # this can be uncommented to display a graph showing the convergence to minimize loss
     # as the mass of the given food is scaled
     if verbose:
         import matplotlib.pyplot as plt
-        xs = []; losses = []
-        for x in range(0, 20):
-            inp = sol.x[0] * (x/10)
-            xs.append(inp)
-            losses.append(scaled_loss(inp, required_normed_nutrients, suggestion, nutrient_dict))
-        plt.plot(xs, losses)
-        plt.title("Loss graph for {}".format(suggestion.desc["name"]))
+        required = deficit_vector(meal, nutrient_dict)
+        _, limit = rda_limit_vectors(nutrient_dict)
+        tracked = ~((required == 0) & np.isnan(limit))
+        sug_norm = norm_rda(suggestion.vector, nutrient_dict)
+        xs = ks[0] * np.arange(0, 20) / 10
+        losses_at = [float(((x * sug_norm - required) ** 2) @ tracked) for x in xs]
+        plt.plot(xs, losses_at)
+        plt.title("Loss graph for {}".format(suggestion.description))
         plt.show()
-    return (scaled_loss(sol.x[0], required_normed_nutrients, suggestion, nutrient_dict), sol.x[0])
+    return (float(losses[0]), float(ks[0]))
 
 def generate_recommendations(meal, pantry, nutrient_dict, n, verbose=False):
     """
@@ -91,38 +109,130 @@ def generate_recommendations(meal, pantry, nutrient_dict, n, verbose=False):
     of RDIs.
         Meal is a meal object representing the current day's meal
         Pantry is an array of Food objects representing potential foods
+        (or a foods x nutrients matrix of their values)
         (Note: pantry food objects must have a mass of 100g)
         Nutrient Dict is a personalized list of RDIs and limits based on the user's preference
     The function returns the loss of that recommendation, the index of the meal, 
-    and the object being suggested itself.
+    and the optimal scale of the food being suggested, sorted by loss.
     """
-    rec_data = []
-    rec_index = 0; rec_loss = sys.maxsize; rec_optimum = 0
-    for rec_i, _ in enumerate(pantry):
-        sug_obj = suggestion_loss(meal, pantry[rec_i], nutrient_dict, verbose)
-        cur_loss = sug_obj[0]
-        # print("name:", pantry[rec_i].desc['name'], "loss:", sug_obj[0], "k:", sug_obj[1])
-        if cur_loss < rec_loss:
-            rec_loss = cur_loss
-            rec_index = rec_i
-            rec_optimum = sug_obj[1]
-        rec_data.append([copy.copy(cur_loss), copy.copy(rec_i), copy.deepcopy(sug_obj[1])])
-        if verbose:
-            print(pantry[rec_i].desc['name'], cur_loss)
+    losses, ks = score_pantry(meal, pantry, nutrient_dict)
+    if verbose:
+        for rec_i, food in enumerate(pantry):
+            print(food.description, losses[rec_i])
             print("^" * 50)
-    rec_data.sort(key=lambda x: x[0])
-    return rec_data[:n]
+    order = np.argsort(losses, kind='stable')[:n]
+    return [[float(losses[i]), int(i), float(ks[i])] for i in order]
+
+def removal_losses(meal, nutrient_dict):
+    """
+    Returns the loss of the meal with each of its foods left out, scored in
+    one pass from the meal totals minus each food's row.
+    """
+    without = meal.vector - meal.matrix
+    deficits = 1 - norm_rda(without, nutrient_dict)
+    return (deficits * deficits).sum(axis=1)
 
 def recommend_removal(meal, nutrient_dict):
-    assert type(meal) == Meal
+    assert isinstance(meal, Meal)
     o_loss = loss(meal, nutrient_dict) # calculate the original loss
-    losses = []
-    for i in range(0, len(meal.foods)):
-        # compute the loss for the meal without each food
-        this_meal = Meal([food for j, food in enumerate(meal.foods) if j != i])
-        losses.append(loss(this_meal, nutrient_dict))
-    if min(losses) < o_loss: 
-        return losses.index(min(losses)) # removing a certain food is beneficial
+    losses = removal_losses(meal, nutrient_dict)
+    if len(losses) and losses.min() < o_loss:
+        return int(np.argmin(losses)) # removing a certain food is beneficial
     else:
         return -1 # removing any certain food is detrimental
-    
\ No newline at end of file
+
+def _diet_loss(x, pantry, base, rda, limit, penalty):
+    """ Loss and gradient of a diet of pantry foods scaled by x on top of the
+    nutrient totals in base. Shortfalls below rda and, weighted by penalty,
+    excesses over limit are squared as fractions of their bound. With a
+    penalty of 1 this equals loss() up to a constant. """
+    totals = base + pantry.T @ x
+    with np.errstate(invalid='ignore'):
+        short = np.nan_to_num(np.maximum(0, 1 - totals / rda))
+        over = np.nan_to_num(np.maximum(0, totals / limit - 1))
+    value = short @ short + penalty * (over @ over)
+    d_totals = np.nan_to_num(-2 * short / rda) + penalty * np.nan_to_num(2 * over / limit)
+    return value, pantry @ d_totals
+
+def optimize_diet(meal, pantry, nutrient_dict, max_foods=None, bounds=(0, 500),
+                  limits="soft", x0=None, tol=1e-6):
+    """
+    Solves for the gram amounts of many pantry foods at once so that, added to
+    meal, they minimize the same RDA-deficit loss as loss().
+        Meal is the current day's Meal (or None to plan from nothing)
+        Pantry is a list of Food objects (100g each) or their foods x nutrients matrix
+        max_foods caps how many pantry foods may be used
+        bounds is a (min, max) grams pair for every food, or a list of pairs
+        limits is "soft" to penalize excesses exactly as loss() does, or "hard"
+        to tighten the penalty until no limit is exceeded
+        x0 is an optional gram vector, e.g. a previous solution, to warm start from
+    The pantry matrix is kept sparse and the problem is solved with L-BFGS-B,
+    so pantries of thousands of foods are practical. Returns a dict with the
+    chosen (index, grams) pairs sorted by grams, the full grams vector, the
+    resulting loss and the names of any limits still exceeded (for example
+    because the meal alone already exceeds them). Requires scipy.
+    """
+    from scipy.optimize import minimize
+    from scipy.sparse import csr_matrix
+
+    assert limits in ("soft", "hard"), f"limits should be 'soft' or 'hard', not {limits}"
+    rda, limit = rda_limit_vectors(nutrient_dict)
+    matrix = pantry_matrix(pantry)
+    n_foods = matrix.shape[0]
+    sparse_pantry = csr_matrix(matrix)
+    base = meal.vector if meal is not None else np.zeros(len(nutrient_ids))
+
+    # work in units of 100g, the amount pantry values are given for
+    if isinstance(bounds, tuple):
+        bounds = [bounds] * n_foods
+    box = [(lo / 100, None if hi is None else hi / 100) for lo, hi in bounds]
+    x = np.zeros(n_foods) if x0 is None else np.asarray(x0, dtype=float) / 100
+
+    def solve(x, box, penalty):
+        sol = minimize(_diet_loss, x, args=(sparse_pantry, base, rda, limit, penalty),
+                       jac=True, method="L-BFGS-B", bounds=box)
+        return sol.x
+
+    def violations(x):
+        totals = base + sparse_pantry.T @ x
+        with np.errstate(invalid='ignore'):
+            return np.flatnonzero(totals > limit * (1 + tol))
+
+    def solve_limits(x, box):
+        x = solve(x, box, 1.0)
+        if limits == "hard":
+            penalty = 1.0
+            while len(violations(x)) and penalty < 1e8:
+                penalty *= 10
+                x = solve(x, box, penalty)
+        return x
+
+    x = solve_limits(x, box)
+
+    if max_foods is not None:
+        # how much of its targets each food covers per 100g
+        scale = np.where(np.isnan(rda), limit, rda)
+        coverage = np.asarray(np.nan_to_num(matrix / scale).sum(axis=1)).ravel()
+        active = np.flatnonzero(x > tol)
+        while len(active) > max_foods:
+            # drop the weakest half of the foods in use, then re-solve warm
+            keep = max(max_foods, len(active) // 2)
+            ranked = active[np.argsort(-(x[active] * coverage[active]), kind='stable')]
+            for i in ranked[keep:]:
+                box[i] = (0, 0)
+                x[i] = 0
+            x = solve_limits(x, box)
+            active = np.flatnonzero(x > tol)
+
+    x[x <= tol] = 0
+    grams = x * 100
+    totals = base + sparse_pantry.T @ x
+    deficit = 1 - norm_rda(totals, nutrient_dict)
+    chosen = np.flatnonzero(grams)
+    chosen = chosen[np.argsort(-grams[chosen], kind='stable')]
+    return {
+        'amounts': [(int(i), float(grams[i])) for i in chosen],
+        'grams': grams,
+        'loss': float(deficit @ deficit),
+        'exceeded': [nutrient_dict[i]['name'] for i in violations(x)]
+    }
@@ -0,0 +1,161 @@
+"""Coalescing and micro-batching of single food lookups.
+
+With Client(batch_window=...) every food() call goes through a FoodLoader.
+Calls for an fdcId that is already being fetched wait for that request
+instead of sending their own, and distinct IDs asked for within
+batch_window seconds of each other are sent together as one /foods POST of
+up to FOODS_BATCH_SIZE IDs. Each caller still gets its own Food.
+
+    client = noms.Client("api key", batch_window=0.005)
+    # food() calls from many threads now share /foods requests
+
+AsyncFoodLoader does the same for AsyncClient within one event loop.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+from . import FOODS_BATCH_SIZE
+from .errors import error_for_status
+
+
+def _resolve(futures, results):
+    """Settle the future of every requested ID from a /foods response. IDs
+    the response left out get NotFoundError, as /food/{fdcId} would give."""
+    found = {str(food_data['fdcId']): food_data for food_data in results}
+    for key, future in futures.items():
+        if key in found:
+            future.set_result(found[key])
+        else:
+            future.set_exception(error_for_status(404, "/food/" + key))
+
+
+class FoodLoader:
+    """Thread-safe dataloader for food dicts.
+
+        fetch:: function taking a list of up to max_batch fdcIds and returning
+        the food dicts found, e.g. a /foods POST
+        window:: seconds to wait for more IDs before sending a batch
+        max_batch:: IDs per batch. A full batch is sent without waiting.
+
+    There is no background thread: the first caller of a batch waits out the
+    window and sends it, and the caller that fills a batch sends it at once.
+    """
+    def __init__(self, fetch, window=0.005, max_batch=FOODS_BATCH_SIZE):
+        self.fetch = fetch
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._in_flight = {} # str(fdcId) -> Future, until its batch returns
+        self._queue = {}     # str(fdcId) -> (fdcId, Future), not yet sent
+        self._leader = False # a caller is waiting out the window
+
+    def load(self, fdcId):
+        """Return the food dict for fdcId, blocking until its batch returns.
+        Raises NotFoundError if the food does not exist, or the error of the
+        failed batch request."""
+        key = str(fdcId)
+        batch = None
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                lead = False
+            else:
+                future = self._in_flight[key] = Future()
+                self._queue[key] = (fdcId, future)
+                if len(self._queue) >= self.max_batch:
+                    batch = self._take()
+                lead = batch is None and not self._leader
+                if lead:
+                    self._leader = True
+
+        if batch is not None:
+            self._dispatch(batch)
+        elif lead:
+            if self.window > 0:
+                time.sleep(self.window)
+            with self._lock:
+                self._leader = False
+                batch = self._take()
+            if batch:
+                self._dispatch(batch)
+        return future.result()
+
+    def _take(self):
+        """Remove up to max_batch queued IDs. Call with the lock held."""
+        keys = list(self._queue)[:self.max_batch]
+        return {key: self._queue.pop(key) for key in keys}
+
+    def _dispatch(self, batch):
+        futures = {key: future for key, (_, future) in batch.items()}
+        try:
+            results = self.fetch([fdcId for fdcId, _ in batch.values()])
+        except BaseException as e:
+            for future in futures.values():
+                future.set_exception(e)
+        else:
+            _resolve(futures, results)
+        finally:
+            with self._lock:
+                for key in batch:
+                    del self._in_flight[key]
+
+
+class AsyncFoodLoader:
+    """FoodLoader for coroutines. fetch is a coroutine function, and batches
+    are sent by tasks scheduled on the running event loop."""
+    def __init__(self, fetch, window=0.005, max_batch=FOODS_BATCH_SIZE):
+        self.fetch = fetch
+        self.window = window
+        self.max_batch = max_batch
+        self._in_flight = {}
+        self._queue = {}
+        self._timer = None
+        self._tasks = set()
+
+    async def load(self, fdcId):
+        key = str(fdcId)
+        future = self._in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._in_flight[key] = loop.create_future()
+            self._queue[key] = (fdcId, future)
+            if len(self._queue) >= self.max_batch:
+                self._send()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._send)
+        # shielded so one cancelled caller does not fail the others
+        return await asyncio.shield(future)
+
+    def _send(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            keys = list(self._queue)[:self.max_batch]
+            batch = {key: self._queue.pop(key) for key in keys}
+            task = asyncio.ensure_future(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch):
+        futures = {key: future for key, (_, future) in batch.items()}
+        try:
+            results = await self.fetch([fdcId for fdcId, _ in batch.values()])
+        except asyncio.CancelledError:
+            # the callers would otherwise wait on these futures forever
+            for future in futures.values():
+                future.cancel()
+            raise
+        except BaseException as e:
+            for future in futures.values():
+                future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            _resolve(futures, results)
+        finally:
+            for key in batch:
+                del self._in_flight[key]
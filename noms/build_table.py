@@ -0,0 +1,19 @@
+"""Rebuild noms/_nutrient_table.py, the precompiled nutrient table loaded by
+noms.nutrient_dict, or check that it is current.
+
+    python -m noms.build_table
+    python -m noms.build_table --check
+"""
+
+import sys
+
+from .nutrient_dict import table_is_current, table_path, write_table
+
+if __name__ == '__main__':
+    if "--check" in sys.argv:
+        from . import _nutrient_table
+        current = table_is_current(_nutrient_table, check_source=True)
+        print("nutrient table is %s" % ("up to date" if current else "out of date"))
+        sys.exit(0 if current else 1)
+    write_table()
+    print("wrote %s" % table_path)
@@ -0,0 +1,132 @@
+"""Persistent on-disk cache for FoodData Central responses.
+Responses are stored in SQLite keyed by endpoint and the normalized request
+payload, so repeat lookups skip the network and the hourly rate budget.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+
+class ResponseCache:
+    """SQLite-backed response cache with a TTL and size-bounded LRU eviction.
+
+        path:: str, database file (':memory:' for a process-local cache)
+        ttl:: float, seconds an entry stays valid (None never expires)
+        max_entries:: int, entries kept before least recently used are evicted
+        max_bytes:: int, optional bound on the total size of stored bodies
+    """
+    def __init__(self, path="noms_cache.sqlite", ttl=30*24*3600, max_entries=10000, max_bytes=None):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS responses (
+                                key TEXT PRIMARY KEY,
+                                body TEXT NOT NULL,
+                                size INTEGER NOT NULL,
+                                created REAL NOT NULL,
+                                accessed REAL NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+
+    @staticmethod
+    def key(endpoint, data=None):
+        """Build the cache key for an endpoint and a process_args payload."""
+        if not data:
+            return endpoint
+        return endpoint + "?" + json.dumps(data, sort_keys=True, separators=(',', ':'))
+
+    def get(self, endpoint, data=None):
+        """Return the decoded response for a request, or None on a miss."""
+        key = self.key(endpoint, data)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT body, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            body, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+        return json.loads(body)
+
+    def set(self, endpoint, data, body):
+        """Store a response body (raw JSON text or a decoded object)."""
+        if not isinstance(body, str):
+            body = json.dumps(body)
+        key = self.key(endpoint, data)
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                             (key, body, len(body), now, now))
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the size bounds hold."""
+        if self.max_entries is not None:
+            count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                self._drop_oldest(count - self.max_entries)
+        if self.max_bytes is not None:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            while total > self.max_bytes:
+                row = self._db.execute("SELECT size FROM responses ORDER BY accessed LIMIT 1").fetchone()
+                if row is None:
+                    break
+                self._drop_oldest(1)
+                total -= row[0]
+
+    def _drop_oldest(self, n):
+        self._db.execute("DELETE FROM responses WHERE key IN "
+                         "(SELECT key FROM responses ORDER BY accessed LIMIT ?)", (n,))
+        self.evictions += n
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current cache size."""
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'expired': self.expired,
+            'evictions': self.evictions,
+            'entries': entries,
+            'bytes': size,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def __repr__(self):
+        return "<ResponseCache: " + str(self.path) + ">"
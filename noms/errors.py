@@ -0,0 +1,61 @@
+"""Exceptions raised by Client and AsyncClient for failed API requests."""
+
+
+class FDCError(Exception):
+    """A FoodData Central request failed.
+
+        status:: HTTP status code, or None if no response was received
+        endpoint:: the API endpoint requested, e.g. "/foods"
+        body:: response text, if any
+    """
+    def __init__(self, message, status=None, endpoint=None, body=None):
+        super().__init__(message)
+        self.status = status
+        self.endpoint = endpoint
+        self.body = body
+
+
+class NotFoundError(FDCError, KeyError):
+    """The requested food does not exist (404). Also a KeyError, like a
+    missing food in LocalClient."""
+    def __str__(self):
+        return Exception.__str__(self)
+
+
+class APIKeyError(FDCError):
+    """The api_key is missing, invalid or disabled (401/403)."""
+
+
+class RateLimitError(FDCError):
+    """The rate limit was exceeded (429) and retrying was not possible.
+
+        retry_after:: seconds the API asked to wait, if it said
+    """
+    def __init__(self, message, status=429, endpoint=None, body=None, retry_after=None):
+        super().__init__(message, status, endpoint, body)
+        self.retry_after = retry_after
+
+
+class ServerError(FDCError):
+    """FoodData Central kept failing (5xx) or could not be reached."""
+
+
+class CircuitOpenError(FDCError):
+    """Requests are being refused without calling the API because recent
+    ones kept failing. See CircuitBreaker."""
+
+
+def error_for_status(status, endpoint, body=None, retry_after=None):
+    """Return the FDCError subclass instance for a failed response."""
+    if status is None:
+        return ServerError("no response from %s" % endpoint, status, endpoint, body)
+    message = "%s failed with response code %s" % (endpoint, status)
+    if status == 404:
+        return NotFoundError(message, status, endpoint, body)
+    if status in (401, 403):
+        return APIKeyError(message, status, endpoint, body)
+    if status == 429:
+        return RateLimitError(message, status, endpoint, body, retry_after)
+    if status >= 500:
+        return ServerError(message, status, endpoint, body)
+    return FDCError(message, status, endpoint, body)
@@ -0,0 +1,273 @@
+"""Local stand-in for the FoodData Central API, for load tests and offline
+development.
+
+FakeFDCServer serves /food/{fdcId}, /foods, /foods/search and /foods/list
+from a list of full-format food dicts (e.g. an FDC JSON export), with
+x-ratelimit-* headers, an hourly quota per api_key that answers 429 once it
+is spent, and injectable latency and 429s.
+
+    with FakeFDCServer(foods, latency=0.05, rate_limit=1000) as server:
+        client = noms.Client("test", base_url=server.url)
+
+Or from the command line:
+
+    python -m noms.fakeserver FoodData_Central_sr_legacy_food_json.json --port 8080
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from . import FOODS_BATCH_SIZE, DataType
+from .local import abridge
+from .search_index import SearchIndex
+
+# sortBy values accepted by the API -> sort key of a food dict
+SORT_KEYS = {
+    'dataType.keyword': lambda f: f.get('dataType') or '',
+    'lowercaseDescription.keyword': lambda f: f['description'].lower(),
+    'fdcId': lambda f: int(f['fdcId']),
+    'publishedDate': lambda f: f.get('publicationDate') or '',
+}
+
+
+def search_format(food_data):
+    """Convert a full-format food dict to the shape of a /foods/search hit."""
+    return {
+        'fdcId': food_data['fdcId'],
+        'description': food_data['description'],
+        'dataType': food_data.get('dataType'),
+        'publishedDate': food_data.get('publicationDate'),
+        'foodNutrients': [{
+            'nutrientId': fn['nutrient'].get('id'),
+            'nutrientName': fn['nutrient']['name'],
+            'nutrientNumber': fn['nutrient']['number'],
+            'unitName': fn['nutrient'].get('unitName'),
+            'value': fn.get('amount'),
+        } for fn in food_data.get('foodNutrients', [])],
+    }
+
+
+class FakeFDCServer:
+    """Threaded HTTP server imitating the FDC API on localhost.
+
+        foods:: iterable of full-format food dicts
+        latency:: seconds added to every response
+        jitter:: up to this many extra seconds, drawn uniformly per response
+        rate_limit:: requests per window for each api_key, reported in the
+        x-ratelimit-* headers. Requests beyond it get 429.
+        window:: seconds in the rate limit window
+        throttle_rate:: fraction of requests answered 429 at random
+        retry_after:: seconds sent in the Retry-After header of random 429s
+        port:: 0 picks a free port; see url once started
+    """
+    def __init__(self, foods=(), latency=0.0, jitter=0.0, rate_limit=1000, window=3600,
+                 throttle_rate=0.0, retry_after=1, host='127.0.0.1', port=0, seed=None):
+        self.foods = {int(food['fdcId']): food for food in foods}
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.window = window
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.host = host
+        self.port = port
+
+        self.index = SearchIndex()
+        for food in self.foods.values():
+            self.index.add(food['fdcId'], food['description'], food.get('dataType'))
+
+        self.stats = {'requests': 0, 'throttled': 0, 'endpoints': {}}
+        self._quota = {} # api_key -> (window start, requests made)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self):
+        """Base URL to pass to Client(base_url=...)."""
+        return "http://%s:%s" % (self.host, self.port)
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _handler(self))
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {'requests': 0, 'throttled': 0, 'endpoints': {}}
+
+    def _admit(self, api_key, endpoint):
+        """Count a request against api_key. Returns (status, headers, body)
+        for a refused request, or (None, headers, None)."""
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['endpoints'][endpoint] = self.stats['endpoints'].get(endpoint, 0) + 1
+            now = time.monotonic()
+            start, used = self._quota.get(api_key, (now, 0))
+            if now - start >= self.window:
+                start, used = now, 0
+            throttled = used >= self.rate_limit
+            if not throttled:
+                used += 1
+            self._quota[api_key] = (start, used)
+            headers = {'x-ratelimit-limit': str(self.rate_limit),
+                       'x-ratelimit-remaining': str(self.rate_limit - used)}
+            if throttled:
+                self.stats['throttled'] += 1
+                headers['Retry-After'] = str(max(1, int(start + self.window - now + 1)))
+                return 429, headers, {'error': {'code': 'OVER_RATE_LIMIT',
+                                                'message': 'You have exceeded your rate limit.'}}
+            if self.throttle_rate and self._random.random() < self.throttle_rate:
+                self.stats['throttled'] += 1
+                headers['Retry-After'] = str(self.retry_after)
+                return 429, headers, {'error': {'code': 'OVER_RATE_LIMIT',
+                                                'message': 'Injected rate limit response.'}}
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        return None, headers, delay
+
+    def _format(self, food, fmt, nutrients):
+        if fmt == 'abridged':
+            return abridge(food, nutrients)
+        return food
+
+    def handle(self, method, path, query, body):
+        """Answer one API request. Returns (status, body object)."""
+        if path.startswith('/food/') and method == 'GET':
+            try:
+                food = self.foods.get(int(path[len('/food/'):]))
+            except ValueError:
+                food = None
+            if food is None:
+                return 404, {'error': 'Not found'}
+            nutrients = query.get('nutrients')
+            return 200, self._format(food, query.get('format', ['full'])[0], nutrients)
+
+        if path == '/foods':
+            data = body if method == 'POST' else {
+                'fdcIds': query.get('fdcIds', [''])[0].split(','), 'format': query.get('format', ['full'])[0]}
+            ids = data.get('fdcIds') or []
+            if len(ids) > FOODS_BATCH_SIZE:
+                return 400, {'error': 'fdcIds may hold at most %s ids' % FOODS_BATCH_SIZE}
+            foods = [self.foods.get(int(i)) for i in ids if str(i).strip().isdigit()]
+            return 200, [self._format(f, data.get('format', 'full'), data.get('nutrients'))
+                         for f in foods if f is not None]
+
+        if path == '/foods/search' and method == 'POST':
+            data_types = [DataType(dt) for dt in body.get('dataType', [])] or None
+            hits = self.index.search(body.get('query', ''), dataTypes=data_types)
+            foods = [self.foods[hit['fdcId']] for hit in hits]
+            sort_by = body.get('sortBy', 'score')
+            if sort_by in SORT_KEYS:
+                foods.sort(key=SORT_KEYS[sort_by], reverse=body.get('sortOrder') == 'desc')
+            elif body.get('sortOrder') == 'asc':
+                foods.reverse()
+            page_size = min(int(body.get('pageSize', 50)), 200)
+            page = int(body.get('pageNumber', 1))
+            return 200, {
+                'totalHits': len(foods),
+                'currentPage': page,
+                'totalPages': (len(foods) + page_size - 1) // page_size,
+                'foods': [search_format(f) for f in foods[(page - 1) * page_size:page * page_size]],
+            }
+
+        if path == '/foods/list' and method == 'POST':
+            data_types = set(body.get('dataType', []))
+            foods = [f for f in self.foods.values() if not data_types or f.get('dataType') in data_types]
+            foods.sort(key=SORT_KEYS.get(body.get('sortBy'), SORT_KEYS['fdcId']),
+                       reverse=body.get('sortOrder') == 'desc')
+            page_size = min(int(body.get('pageSize', 50)), 200)
+            page = int(body.get('pageNumber', 1))
+            return 200, [abridge(f) for f in foods[(page - 1) * page_size:page * page_size]]
+
+        return 404, {'error': 'Not found'}
+
+
+def _handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _respond(self, method):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            path = url.path
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length) if length else b''
+
+            api_key = query.get('api_key', [None])[0]
+            if api_key is None:
+                status, headers, body = 403, {}, {'error': {'code': 'API_KEY_MISSING',
+                                                            'message': 'No api_key was supplied.'}}
+            else:
+                status, headers, delay = server._admit(api_key, path.rsplit('/', 1)[0] if path.startswith('/food/') else path)
+                body = delay
+                if status is None:
+                    if delay:
+                        time.sleep(delay)
+                    try:
+                        status, body = server.handle(method, path, query, json.loads(raw) if raw else {})
+                    except (ValueError, TypeError, KeyError) as e:
+                        status, body = 400, {'error': str(e)}
+
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            self._respond('GET')
+
+        def do_POST(self):
+            self._respond('POST')
+
+    return Handler
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    from .local import _foods_from_csv, _foods_from_json
+
+    parser = argparse.ArgumentParser(description="Serve an FDC export as a fake FDC API")
+    parser.add_argument("source", help="FDC CSV export directory or JSON export file")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=1000)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    foods = _foods_from_csv(args.source) if os.path.isdir(args.source) else _foods_from_json(args.source)
+    server = FakeFDCServer(foods, latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit,
+                           throttle_rate=args.throttle_rate, port=args.port).start()
+    print("serving %s foods at %s" % (len(server.foods), server.url))
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,115 @@
+"""Helpers for resolving recipe ingredient lines ("2 cups broccoli, raw") to
+FDC foods and gram amounts. Used by Client.resolve_ingredients.
+"""
+
+import re
+
+FRACTIONS = {'½': .5, '⅓': 1/3, '⅔': 2/3, '¼': .25, '¾': .75, '⅛': .125}
+
+# unit spellings -> canonical unit
+UNITS = {
+    'cup': 'cup', 'cups': 'cup', 'c': 'cup',
+    'tablespoon': 'tbsp', 'tablespoons': 'tbsp', 'tbsp': 'tbsp', 'tbs': 'tbsp', 'T': 'tbsp',
+    'teaspoon': 'tsp', 'teaspoons': 'tsp', 'tsp': 'tsp', 't': 'tsp',
+    'ounce': 'oz', 'ounces': 'oz', 'oz': 'oz',
+    'pound': 'lb', 'pounds': 'lb', 'lb': 'lb', 'lbs': 'lb',
+    'gram': 'g', 'grams': 'g', 'g': 'g',
+    'kilogram': 'kg', 'kilograms': 'kg', 'kg': 'kg',
+    'slice': 'slice', 'slices': 'slice',
+    'clove': 'clove', 'cloves': 'clove',
+    'piece': 'piece', 'pieces': 'piece',
+    'stalk': 'stalk', 'stalks': 'stalk',
+    'large': 'large', 'medium': 'medium', 'small': 'small',
+}
+
+# units with a fixed weight, in grams
+MASS_UNITS = {'g': 1, 'kg': 1000, 'oz': 28.3495, 'lb': 453.592}
+
+# portion wording that names each unit
+UNIT_WORDS = {'tbsp': ('tbsp', 'tablespoon'), 'tsp': ('tsp', 'teaspoon')}
+
+# description suffixes that mark the plain version of a food
+PLAIN_SUFFIXES = ["", ", raw", ", raw, nfs", ", nfs", ", fresh"]
+
+QUANTITY = re.compile(r"^\s*(\d+\s+\d+/\d+|\d+/\d+|\d*\.\d+|\d+)?\s*([½⅓⅔¼¾⅛])?")
+
+
+def parse_ingredient(line):
+    """Split an ingredient line into (amount, unit, query). amount defaults
+    to 1 and unit is None when the line does not name one.
+    """
+    match = QUANTITY.match(line)
+    number, fraction = match.groups()
+    amount = 0.0
+    if number:
+        for part in number.split():
+            if '/' in part:
+                numerator, denominator = part.split('/')
+                amount += float(numerator) / float(denominator)
+            else:
+                amount += float(part)
+    if fraction:
+        amount += FRACTIONS[fraction]
+    if not number and not fraction:
+        amount = 1.0
+
+    rest = line[match.end():].strip()
+    unit = None
+    words = rest.split(None, 1)
+    if words:
+        word = words[0].rstrip('.')
+        canonical = UNITS.get(word, UNITS.get(word.lower()))
+        # single letters are only units in their exact case (T vs t)
+        if canonical is not None and (len(word) > 1 or word in UNITS):
+            unit = canonical
+            rest = words[1] if len(words) > 1 else ''
+    if rest.lower().startswith('of '):
+        rest = rest[3:]
+    return amount, unit, rest
+
+
+def normalize_query(query):
+    """Lowercase a food name and drop parentheticals and extra punctuation,
+    so equivalent lines share one search.
+    """
+    query = re.sub(r"\([^)]*\)", " ", query.lower())
+    query = re.sub(r"\s+", " ", query)
+    return query.strip(" ,.;:-")
+
+
+def select_match(foods, query):
+    """Pick the best search result for a query: a description that is the
+    query itself or its plain version (", raw", ", nfs", ...), otherwise one
+    containing the query, preferring the richest nutrient data; failing that,
+    the top search result.
+    """
+    if not foods:
+        return None
+    plain = [query + suffix for suffix in PLAIN_SUFFIXES]
+    candidates = [f for f in foods if f['description'].lower() in plain]
+    if not candidates:
+        candidates = [f for f in foods if query in f['description'].lower()]
+    if not candidates:
+        return foods[0]
+    return max(candidates, key=lambda f: len(f.get('foodNutrients', [])))
+
+
+def match_portion(food, amount, unit):
+    """Return (portion, grams) for an amount of a food. Mass units are
+    converted directly; other units are matched against the food's portions,
+    using its first portion when the line names no unit. grams is None when
+    no portion fits.
+    """
+    if unit in MASS_UNITS:
+        return None, amount * MASS_UNITS[unit]
+    if not food.portions:
+        return None, None
+    if unit is None:
+        portion = food.portions[0]
+        return portion, amount * portion.unit_weight
+    words = UNIT_WORDS.get(unit, (unit,))
+    for portion in food.portions:
+        text = (portion.modifier + ' ' + (portion.measure or '')).lower()
+        if any(re.search(r"\b" + w, text) for w in words):
+            return portion, amount * portion.unit_weight
+    return None, None
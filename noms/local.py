@@ -0,0 +1,346 @@
+"""Offline FoodData Central database built from the FDC bulk downloads.
+
+import_fdc() ingests a Foundation / SR Legacy export (either the CSV
+directory or the JSON file from https://fdc.nal.usda.gov/download-datasets.html)
+into an indexed SQLite store. LocalClient then answers food, foods and
+foods_search with the same signatures and return types as noms.Client.
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import threading
+
+from . import Client, DataType, Food, Format, Sorting
+from .errors import NotFoundError
+from .search_index import SearchIndex
+
+# data_type values used in food.csv, mapped to the names used by the API
+CSV_DATA_TYPES = {
+    'foundation_food': DataType.Foundation.value,
+    'sr_legacy_food': DataType.SR.value,
+    'branded_food': DataType.Branded.value,
+    'survey_fndds_food': DataType.FNDDS.value,
+}
+
+# top-level keys of the JSON exports
+JSON_FOOD_KEYS = ['FoundationFoods', 'SRLegacyFoods', 'SurveyFoods', 'BrandedFoods']
+
+SORT_COLUMNS = {
+    Sorting.dataType: 'data_type',
+    Sorting.description: 'lower_description',
+    Sorting.fdcId: 'fdc_id',
+    Sorting.publishedDate: 'published',
+}
+
+
+def _connect(path):
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("""CREATE TABLE IF NOT EXISTS foods (
+                      fdc_id INTEGER PRIMARY KEY,
+                      data_type TEXT,
+                      description TEXT NOT NULL,
+                      lower_description TEXT NOT NULL,
+                      published TEXT,
+                      body TEXT NOT NULL)""")
+    db.execute("CREATE INDEX IF NOT EXISTS foods_data_type ON foods (data_type)")
+    db.execute("CREATE INDEX IF NOT EXISTS foods_description ON foods (lower_description)")
+    return db
+
+
+def _read_csv(directory, name):
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        return
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+def _number(value):
+    if value in (None, ''):
+        return None
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def _foods_from_csv(directory):
+    """Assemble full-format food dicts from an FDC CSV export directory."""
+    nutrients = {}
+    for row in _read_csv(directory, 'nutrient.csv'):
+        nutrients[row['id']] = {
+            'id': int(row['id']),
+            'number': row['nutrient_nbr'],
+            'name': row['name'],
+            'rank': _number(row.get('rank')),
+            'unitName': row['unit_name'],
+        }
+
+    units = {row['id']: row['name'] for row in _read_csv(directory, 'measure_unit.csv')}
+
+    food_nutrients = {}
+    for row in _read_csv(directory, 'food_nutrient.csv'):
+        if row['nutrient_id'] not in nutrients or row['amount'] == '':
+            continue
+        food_nutrients.setdefault(row['fdc_id'], []).append({
+            'type': 'FoodNutrient',
+            'id': int(row['id']),
+            'nutrient': nutrients[row['nutrient_id']],
+            'amount': float(row['amount']),
+        })
+
+    food_portions = {}
+    for row in _read_csv(directory, 'food_portion.csv'):
+        portion = {
+            'id': int(row['id']),
+            'sequenceNumber': _number(row.get('seq_num')),
+            'gramWeight': float(row['gram_weight']),
+            'modifier': row.get('modifier', ''),
+            'portionDescription': row.get('portion_description', ''),
+            'measureUnit': {'id': _number(row.get('measure_unit_id')),
+                            'name': units.get(row.get('measure_unit_id'), 'undetermined')},
+        }
+        if row.get('amount'):
+            portion['amount'] = float(row['amount'])
+        food_portions.setdefault(row['fdc_id'], []).append(portion)
+
+    brand_owners = {row['fdc_id']: row['brand_owner'] for row in _read_csv(directory, 'branded_food.csv')
+                    if row.get('brand_owner')}
+
+    for row in _read_csv(directory, 'food.csv'):
+        fdc_id = row['fdc_id']
+        food = {
+            'fdcId': int(fdc_id),
+            'description': row['description'],
+            'dataType': CSV_DATA_TYPES.get(row['data_type'], row['data_type']),
+            'publicationDate': row.get('publication_date'),
+            'foodNutrients': food_nutrients.get(fdc_id, []),
+            'foodPortions': sorted(food_portions.get(fdc_id, []),
+                                   key=lambda p: p['sequenceNumber'] or 0),
+        }
+        if fdc_id in brand_owners:
+            food['brandOwner'] = brand_owners[fdc_id]
+        yield food
+
+
+def _foods_from_json(path):
+    """Yield full-format food dicts from an FDC JSON export file."""
+    with open(path, encoding='utf-8') as f:
+        obj = json.load(f)
+    if isinstance(obj, list):
+        yield from obj
+        return
+    for key in JSON_FOOD_KEYS:
+        yield from obj.get(key, [])
+
+
+def import_fdc(source, path="noms_fdc.sqlite"):
+    """Ingest an FDC bulk export into the local database at path.
+
+        source:: str, a CSV export directory or a JSON export file
+        path:: str, SQLite database to create or update
+
+    Returns the number of foods imported.
+    """
+    if os.path.isdir(source):
+        foods = _foods_from_csv(source)
+    else:
+        foods = _foods_from_json(source)
+
+    db = _connect(path)
+    count = 0
+    with db:
+        for food in foods:
+            db.execute("INSERT OR REPLACE INTO foods VALUES (?, ?, ?, ?, ?, ?)", (
+                int(food['fdcId']),
+                food.get('dataType'),
+                food['description'],
+                food['description'].lower(),
+                food.get('publicationDate'),
+                json.dumps(food, separators=(',', ':'))
+            ))
+            count += 1
+    db.close()
+    return count
+
+
+def abridge(food_data, nutrients=None):
+    """Convert a full-format food dict into the abridged format returned by
+    /foods, optionally keeping only the given nutrient numbers.
+    """
+    if nutrients is not None:
+        nutrients = {str(n) for n in nutrients}
+    food_nutrients = []
+    for fn in food_data.get('foodNutrients', []):
+        nutrient = fn['nutrient']
+        if nutrients is not None and nutrient['number'] not in nutrients:
+            continue
+        food_nutrients.append({
+            'number': nutrient['number'],
+            'name': nutrient['name'],
+            'amount': fn.get('amount'),
+            'unitName': nutrient['unitName'],
+        })
+    return {
+        'fdcId': food_data['fdcId'],
+        'description': food_data['description'],
+        'dataType': food_data.get('dataType'),
+        'publicationDate': food_data.get('publicationDate'),
+        'foodNutrients': food_nutrients,
+    }
+
+
+class LocalClient:
+    """Drop-in replacement for noms.Client backed by a local database built
+    with import_fdc(). No network access or API key is needed.
+    """
+    process_args = Client.process_args
+
+    def __init__(self, path="noms_fdc.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = _connect(path)
+        self._search_index = None
+
+    @classmethod
+    def from_export(cls, source, path="noms_fdc.sqlite"):
+        """Import an FDC bulk export and open a LocalClient on the result."""
+        import_fdc(source, path)
+        return cls(path)
+
+    @property
+    def search_index(self):
+        """SearchIndex over every imported food, built on first use. Pass it
+        to noms.Client to answer local searches from the whole import.
+        """
+        if self._search_index is None:
+            index = SearchIndex()
+            with self._lock:
+                rows = self._db.execute("SELECT fdc_id, description, data_type FROM foods").fetchall()
+            for fdc_id, description, data_type in rows:
+                index.add(fdc_id, description, data_type)
+            self._search_index = index
+        return self._search_index
+
+    def _bodies(self, fdcIds):
+        ids = [int(i) for i in fdcIds]
+        found = {}
+        with self._lock:
+            # stay under SQLite's bound parameter limit
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start+500]
+                rows = self._db.execute(
+                    "SELECT fdc_id, body FROM foods WHERE fdc_id IN (%s)" % ','.join('?' * len(chunk)),
+                    chunk).fetchall()
+                found.update(rows)
+        return [json.loads(found[i]) for i in ids if i in found]
+
+    def food(self,
+             fdcId: str):
+        """Retrieves a single food item by an FDC ID. Raises NotFoundError, as
+        noms.Client does, if it is not in the local database."""
+        bodies = self._bodies([fdcId])
+        if not bodies:
+            raise NotFoundError("fdcId %s is not in the local database" % fdcId, 404, "/food/" + str(fdcId))
+        return Food(bodies[0])
+
+    def foods(self,
+              fdcIds: list,
+              format: Format=Format.abridged,
+              nutrients: list=None):
+        """Retrieves a list of food items by FDC ID. Unlike the API there is no
+        limit on the number of IDs. Unknown IDs are omitted.
+        """
+        data = self.process_args(**{
+            'fdcIds': fdcIds,
+            'format': format,
+            'nutrients': nutrients
+        })
+        bodies = self._bodies(data['fdcIds'])
+        if data['format'] == Format.abridged.value:
+            bodies = [abridge(b, data.get('nutrients')) for b in bodies]
+        return [Food(b) for b in bodies]
+
+    def foods_search(self,
+                     query: str,
+                     dataTypes:list=[DataType.Foundation, DataType.SR, DataType.FNDDS],
+                     pageSize:int=10,
+                     pageNumber:int=1,
+                     sortBy:Sorting=Sorting.score,
+                     reverse=False,
+                     brandOwner:str=None,
+                     getAll=False,
+                     exact=False):
+        """Search the local database by keywords. Every keyword must appear in
+        the description. Results are ranked like the API's score by default.
+        brandOwner keeps only branded foods of that brand owner (ignoring case).
+        """
+        data = self.process_args(**{
+            'query': query,
+            'dataTypes': dataTypes,
+            'pageSize': pageSize,
+            'pageNumber': pageNumber,
+            'sortBy': sortBy,
+            'reverse': reverse,
+            'brandOwner': brandOwner
+        })
+        lower_query = query.lower()
+        if exact:
+            terms = [lower_query]
+        else:
+            terms = lower_query.replace('description:', '').replace(',', ' ').split()
+
+        where = ["data_type IN (%s)" % ','.join('?' * len(data['dataType']))]
+        params = list(data['dataType'])
+        for term in terms:
+            where.append("instr(lower_description, ?) > 0")
+            params.append(term)
+        if 'brandOwner' in data:
+            where.append("lower(json_extract(body, '$.brandOwner')) = ?")
+            params.append(data['brandOwner'].lower())
+
+        sql = "SELECT fdc_id, description FROM foods WHERE " + " AND ".join(where)
+        if sortBy in SORT_COLUMNS:
+            sql += " ORDER BY %s %s" % (SORT_COLUMNS[sortBy], 'DESC' if reverse else 'ASC')
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+
+        if sortBy == Sorting.score:
+            rows.sort(key=lambda r: _score(r[1].lower(), lower_query, terms), reverse=not reverse)
+
+        if not getAll:
+            start = (pageNumber - 1) * pageSize
+            rows = rows[start:start+pageSize]
+
+        return [{'description': description, 'fdcId': fdc_id} for fdc_id, description in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM foods").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _score(description, query, terms):
+    """Rough stand-in for the API relevance score: whole-query matches and
+    matches at the start of the description rank first, then shorter
+    descriptions.
+    """
+    score = 0.0
+    if description == query:
+        score += 100
+    if description.startswith(query):
+        score += 10
+    elif query in description:
+        score += 5
+    words = description.replace(',', ' ').split()
+    score += sum(2 for t in terms if t in words)
+    return score - len(description) / 100
+
+
+if __name__ == '__main__':
+    import sys
+    n = import_fdc(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else "noms_fdc.sqlite")
+    print("imported %s foods" % n)
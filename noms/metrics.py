@@ -0,0 +1,206 @@
+"""Instrumentation hooks for Client and AsyncClient.
+
+Clients report every request, retry, rate limiter wait, quota update and
+cache lookup to a Hooks object. The default Hooks ignores them. Metrics
+records them: per-endpoint latency and payload histograms, response codes,
+retries, throttling time, x-ratelimit-remaining over time and cache hit
+ratios. Read them with snapshot() or as Prometheus text with prometheus().
+
+    metrics = noms.Metrics()
+    client = noms.Client("api key", metrics=metrics)
+    ...
+    print(metrics.prometheus())
+
+To send the events elsewhere (statsd, OpenTelemetry, ...) subclass Hooks.
+"""
+
+import bisect
+import collections
+import threading
+import time
+
+# upper bounds of the histogram buckets
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60) # seconds
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def endpoint_label(endpoint):
+    """Endpoint name for metrics, with the fdcId of /food/{fdcId} removed."""
+    if endpoint.startswith("/food/"):
+        return "/food/{fdcId}"
+    return endpoint
+
+
+class Histogram:
+    """Fixed-bucket histogram, cumulative like Prometheus."""
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        cumulative = 0
+        buckets = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return {'buckets': buckets, 'count': self.count, 'sum': self.sum}
+
+
+class Hooks:
+    """Events emitted by a client. Every method is a no-op here."""
+    def request(self, endpoint, method, status, seconds, size):
+        """A response arrived. status is None if the request failed to send."""
+
+    def retry(self, endpoint, attempt, delay):
+        """A request is about to be retried after delay seconds."""
+
+    def throttle(self, seconds):
+        """The rate limiter held a request back for seconds."""
+
+    def quota(self, remaining, limit):
+        """A response reported the x-ratelimit-* headers."""
+
+    def cache(self, endpoint, hit):
+        """The response cache was consulted for endpoint."""
+
+
+class Metrics(Hooks):
+    """Thread-safe in-memory metrics for one or more clients.
+
+        history:: number of x-ratelimit-remaining samples kept
+    """
+    def __init__(self, history=1000):
+        self._lock = threading.Lock()
+        self.history = history
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency = collections.defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+            self.payload = collections.defaultdict(lambda: Histogram(BYTES_BUCKETS))
+            self.responses = collections.Counter() # (endpoint, status) -> count
+            self.retries = collections.Counter()   # endpoint -> count
+            self.throttling = Histogram(LATENCY_BUCKETS)
+            self.quota_samples = collections.deque(maxlen=self.history) # (unix time, remaining)
+            self.quota_limit = None
+            self.cache_hits = collections.Counter()
+            self.cache_misses = collections.Counter()
+
+    def request(self, endpoint, method, status, seconds, size):
+        with self._lock:
+            self.latency[endpoint].observe(seconds)
+            self.payload[endpoint].observe(size)
+            self.responses[endpoint, status] += 1
+
+    def retry(self, endpoint, attempt, delay):
+        with self._lock:
+            self.retries[endpoint] += 1
+
+    def throttle(self, seconds):
+        with self._lock:
+            self.throttling.observe(seconds)
+
+    def quota(self, remaining, limit):
+        with self._lock:
+            self.quota_samples.append((time.time(), remaining))
+            if limit is not None:
+                self.quota_limit = limit
+
+    def cache(self, endpoint, hit):
+        with self._lock:
+            if hit:
+                self.cache_hits[endpoint] += 1
+            else:
+                self.cache_misses[endpoint] += 1
+
+    def snapshot(self):
+        """Return all metrics as plain dicts and lists."""
+        with self._lock:
+            endpoints = sorted(set(self.latency) | set(self.cache_hits) | set(self.cache_misses)
+                               | set(self.retries))
+            cache = {}
+            for endpoint in endpoints:
+                hits, misses = self.cache_hits[endpoint], self.cache_misses[endpoint]
+                if hits or misses:
+                    cache[endpoint] = {'hits': hits, 'misses': misses, 'hit_ratio': hits / (hits + misses)}
+            return {
+                'latency': {e: h.snapshot() for e, h in self.latency.items()},
+                'payload_bytes': {e: h.snapshot() for e, h in self.payload.items()},
+                'responses': [{'endpoint': e, 'status': s, 'count': c}
+                              for (e, s), c in sorted(self.responses.items(), key=str)],
+                'retries': dict(self.retries),
+                'throttling': self.throttling.snapshot(),
+                'quota': {
+                    'limit': self.quota_limit,
+                    'remaining': self.quota_samples[-1][1] if self.quota_samples else None,
+                    'history': list(self.quota_samples),
+                },
+                'cache': cache,
+            }
+
+    def prometheus(self, prefix="noms"):
+        return format_prometheus(self.snapshot(), prefix)
+
+
+def _labels(**labels):
+    return "{" + ",".join('%s="%s"' % (k, v) for k, v in labels.items()) + "}"
+
+
+def _histogram(lines, name, snapshot, **labels):
+    for bound, count in snapshot['buckets']:
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append("%s_bucket%s %d" % (name, _labels(**labels, le=le), count))
+    lines.append("%s_sum%s %r" % (name, _labels(**labels) if labels else "", snapshot['sum']))
+    lines.append("%s_count%s %d" % (name, _labels(**labels) if labels else "", snapshot['count']))
+
+
+def format_prometheus(snapshot, prefix="noms"):
+    """Render a Metrics snapshot in the Prometheus text exposition format."""
+    lines = []
+    name = prefix + "_request_duration_seconds"
+    lines += ["# HELP %s FDC API request latency." % name, "# TYPE %s histogram" % name]
+    for endpoint, histogram in sorted(snapshot['latency'].items()):
+        _histogram(lines, name, histogram, endpoint=endpoint)
+
+    name = prefix + "_response_size_bytes"
+    lines += ["# HELP %s FDC API response body size." % name, "# TYPE %s histogram" % name]
+    for endpoint, histogram in sorted(snapshot['payload_bytes'].items()):
+        _histogram(lines, name, histogram, endpoint=endpoint)
+
+    name = prefix + "_responses_total"
+    lines += ["# HELP %s FDC API responses by status code." % name, "# TYPE %s counter" % name]
+    for row in snapshot['responses']:
+        lines.append("%s%s %d" % (name, _labels(endpoint=row['endpoint'], status=row['status']), row['count']))
+
+    name = prefix + "_retries_total"
+    lines += ["# HELP %s Retried FDC API requests." % name, "# TYPE %s counter" % name]
+    for endpoint, count in sorted(snapshot['retries'].items()):
+        lines.append("%s%s %d" % (name, _labels(endpoint=endpoint), count))
+
+    name = prefix + "_throttle_seconds"
+    lines += ["# HELP %s Time requests waited on the rate limiter." % name, "# TYPE %s histogram" % name]
+    _histogram(lines, name, snapshot['throttling'])
+
+    quota = snapshot['quota']
+    if quota['remaining'] is not None:
+        name = prefix + "_ratelimit_remaining"
+        lines += ["# HELP %s Last x-ratelimit-remaining reported by the API." % name, "# TYPE %s gauge" % name,
+                  "%s %d" % (name, quota['remaining'])]
+    if quota['limit'] is not None:
+        name = prefix + "_ratelimit_limit"
+        lines += ["# HELP %s Last x-ratelimit-limit reported by the API." % name, "# TYPE %s gauge" % name,
+                  "%s %d" % (name, quota['limit'])]
+
+    for kind in ('hits', 'misses'):
+        name = "%s_cache_%s_total" % (prefix, kind)
+        lines += ["# HELP %s Response cache %s." % (name, kind), "# TYPE %s counter" % name]
+        for endpoint, counts in sorted(snapshot['cache'].items()):
+            lines.append("%s%s %d" % (name, _labels(endpoint=endpoint), counts[kind]))
+    return "\n".join(lines) + "\n"
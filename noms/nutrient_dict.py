@@ -1,22 +1,28 @@
-import json
+"""The nutrients noms tracks, with default RDAs and limits.
+
+Importing this module loads nutrient_dict from _nutrient_table.py, which is
+generated from nutrient_ids.json and assign_rdas() so the JSON decoding and
+RDA chain do not run on every import. After changing either, bump
+TABLE_VERSION and rebuild the table with `python -m noms.build_table`.
+"""
+
 import os
-import codecs
+import functools
+import logging
+
+import numpy as np
+
+# version of the data in nutrient_ids.json and the rules in assign_rdas()
+TABLE_VERSION = 1
 
 def index_from_name(name):
-    i = 0
-    for nutrient in nutrient_dict:
-        if nutrient["name"] == name:
-            return i
-        if "nickname" in nutrient.keys():
-            if nutrient["nickname"] == name:
-                return i
-        i += 1
-    # if not found, return -1
-    return -1
+    """Return the index of a nutrient in nutrient_dict by name or nickname,
+    or -1 if it is not tracked."""
+    return _index_from_name.get(name, -1)
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
-nutrient_file = codecs.open("{}/nutrient_ids.json".format(dir_path), encoding="utf-8").read()
-nutrient_dict = json.loads(nutrient_file)
+source_path = os.path.join(dir_path, "nutrient_ids.json")
+table_path = os.path.join(dir_path, "_nutrient_table.py")
 
 # PROFILE INFORMATION
 tdee = 2000 #kcal per day
@@ -28,131 +34,254 @@ fat_p = 0.25
 # US dietary guidelines: https://health.gov/dietaryguidelines/2015/guidelines/executive-summary/
 sugar_p = 0.10
 
-# Assign RDAs, some dependent on gender or tdee
-for item in nutrient_dict:
-    id = item["nutrient_id"]
-    # PROXIMATES
-    if id == 203: # Protein, g
-        item.update(rda=(tdee/4)*protein_p)
-    if id == 204: # Fat, g
-        item.update(rda=(tdee/9)*fat_p)
-    if id == 205: # Carbs, g
-        item.update(rda=(tdee/4)*carb_p)
-    if id == 207: # Ash, g
-        item.update(rda=None)
-    if id == 208: # Calories, kcal
-        item.update(rda=tdee)
-    if id == 221: # Alcohol, g note: 7 calories per gram
-        item.update(rda=None)
-    if id == 255: # Water, g
-        item.update(rda=2000)
-    # OTHER
-    if id == 262: # Caffeine, mg
-        item.update(rda=None)
-        item.update(limit=400)
-    if id == 263: # Theobromine, mg
-        item.update(rda=None)
-        item.update(limit=300)
-    # PROXIMATES
-    if id == 269: # Sugar, g
-        item.update(rda=None)
-        item.update(limit=(tdee/4)*sugar_p)
-    if id == 291: # Fiber, g note: 14 grams for every 1000 calories
-        item.update(rda=tdee*0.014)
-    # MINERALS
-    if id == 301: # Calcium, mg
-        item.update(rda=1000)
-        item.update(limit=2500)
-    if id == 303: # Iron, mg
-        item.update(rda=8)
-        item.update(limit=45)
-    if id == 304: # Magnesium, mg
-        item.update(rda=300)
-        item.update(limit=700)
-    if id == 305: # Phosphorus, mg
-        item.update(rda=700)
-        item.update(limit=4000)
-    if id == 306: # Potassium, mg
-        item.update(rda=1400)
-        item.update(limit=6000)
-    if id == 307: # Sodium, mg
-        item.update(rda=1000)
-        item.update(limit=2300)
-    if id == 309: # Zinc, mg
-        item.update(rda=12)
-        item.update(limit=100)
-    if id == 312: # Copper, mg
-        item.update(rda=0.9)
-        item.update(limit=10)
-    if id == 313: # Fluoride, ug
-        item.update(rda=400)
-        item.update(limit=10000)
-    if id == 315: # Manganese, mg
-        item.update(rda=1.8)
-    if id == 317: # Selenium, ug
-        item.update(rda=70)
-        item.update(limit=400)
-    # VITAMINS
-    if id == 318: # Vitamin A, IU
-        item.update(rda=900)
-        item.update(limit=20000)
-    if id == 323: # Vitamin E, mg
-        item.update(rda=15)
-        item.update(limit=1000)
-    if id == 324: # Vitamin D, IU
-        item.update(rda=1000)
-        item.update(limit=8000)
-    if id == 401: # Vitamin C, mg
-        item.update(rda=90)
-        item.update(limit=2000)
-    if id == 404: # Vitamin B-1, mg
-        item.update(rda=1.2)
-    if id == 405: # Vitamin B-2, mg
-        item.update(rda=1.3)
-    if id == 406: # Vitamin B-3, mg
-        item.update(rda=16)
-    if id == 410: # Vitamin B-5, mg
-        item.update(rda=4)
-    if id == 415: # Vitamin B-6, mg
-        item.update(rda=1.3)
-        item.update(limit=100)
-    if id == 417: # Vitamin B-9, ug
-        item.update(rda=400)
-        item.update(limit=1000)
-    if id == 418: # Vitamin B-12, mg
-        item.update(rda=2.4)
-    if id == 421: # Choline, mg
-        item.update(rda=550)
-        item.update(limit=3500)
-    if id == 430: # Vitamin K, ug
-        item.update(rda=120)
-    # LIPIDS
-    if id == 601: # Cholesterol, mg
-        item.update(rda=None)
-        item.update(limit=300)
-    if id == 605: # Trans Fat, g
-        item.update(rda=None)
-        # avoid more than 5% of fat calories from trans fat
-        item.update(limit=(tdee/9)*(fat_p*0.05))
-    if id == 606: # Saturated Fat, g
-        item.update(rda=None)
-        item.update(limit=(tdee/9)*(fat_p*0.3))
-    if id == 621: # DHA, g
-        item.update(rda=0.5)
-    if id == 629: # EPA, g
-        item.update(rda=0.5)
-    if id == 645: # Monounsaturated Fat, g
-        item.update(rda=(tdee/9)*(fat_p*.40))
-    if id == 646: # Polyunsaturated Fat, g
-        item.update(rda=(tdee/9)*(fat_p*.30))
-    if id == 851: # ALA, g
-        item.update(rda=0.6)
-    if "limit" not in item.keys():
-        item.update(limit=None)
-
-# Round values to avoid long decimals in rda values
-for item in nutrient_dict:
-    if item["rda"] != None:
-        item["rda"] = round(item["rda"], 2)
-    if item["limit"] != None:
-        item["limit"] = round(item["limit"], 2)
\ No newline at end of file
+def assign_rdas(items, tdee, protein_p, carb_p, fat_p, sugar_p, sex=None, age=None):
+    """Set the rda and limit of each nutrient in items (a list of nutrient
+    dicts) for a profile. sex ("male" or "female") and age (years) adjust the
+    values that differ from the adult male defaults, following the NIH
+    Dietary Reference Intakes."""
+    # Assign RDAs, some dependent on gender or tdee
+    for item in items:
+        id = item["nutrient_id"]
+        # PROXIMATES
+        if id == 203: # Protein, g
+            item.update(rda=(tdee/4)*protein_p)
+        if id == 204: # Fat, g
+            item.update(rda=(tdee/9)*fat_p)
+        if id == 205: # Carbs, g
+            item.update(rda=(tdee/4)*carb_p)
+        if id == 207: # Ash, g
+            item.update(rda=None)
+        if id == 208: # Calories, kcal
+            item.update(rda=tdee)
+        if id == 221: # Alcohol, g note: 7 calories per gram
+            item.update(rda=None)
+        if id == 255: # Water, g
+            item.update(rda=2000)
+        # OTHER
+        if id == 262: # Caffeine, mg
+            item.update(rda=None)
+            item.update(limit=400)
+        if id == 263: # Theobromine, mg
+            item.update(rda=None)
+            item.update(limit=300)
+        # PROXIMATES
+        if id == 269: # Sugar, g
+            item.update(rda=None)
+            item.update(limit=(tdee/4)*sugar_p)
+        if id == 291: # Fiber, g note: 14 grams for every 1000 calories
+            item.update(rda=tdee*0.014)
+        # MINERALS
+        if id == 301: # Calcium, mg
+            item.update(rda=1000)
+            item.update(limit=2500)
+        if id == 303: # Iron, mg
+            item.update(rda=8)
+            item.update(limit=45)
+        if id == 304: # Magnesium, mg
+            item.update(rda=300)
+            item.update(limit=700)
+        if id == 305: # Phosphorus, mg
+            item.update(rda=700)
+            item.update(limit=4000)
+        if id == 306: # Potassium, mg
+            item.update(rda=1400)
+            item.update(limit=6000)
+        if id == 307: # Sodium, mg
+            item.update(rda=1000)
+            item.update(limit=2300)
+        if id == 309: # Zinc, mg
+            item.update(rda=12)
+            item.update(limit=100)
+        if id == 312: # Copper, mg
+            item.update(rda=0.9)
+            item.update(limit=10)
+        if id == 313: # Fluoride, ug
+            item.update(rda=400)
+            item.update(limit=10000)
+        if id == 315: # Manganese, mg
+            item.update(rda=1.8)
+        if id == 317: # Selenium, ug
+            item.update(rda=70)
+            item.update(limit=400)
+        # VITAMINS
+        if id == 318: # Vitamin A, IU
+            item.update(rda=900)
+            item.update(limit=20000)
+        if id == 323: # Vitamin E, mg
+            item.update(rda=15)
+            item.update(limit=1000)
+        if id == 324: # Vitamin D, IU
+            item.update(rda=1000)
+            item.update(limit=8000)
+        if id == 401: # Vitamin C, mg
+            item.update(rda=90)
+            item.update(limit=2000)
+        if id == 404: # Vitamin B-1, mg
+            item.update(rda=1.2)
+        if id == 405: # Vitamin B-2, mg
+            item.update(rda=1.3)
+        if id == 406: # Vitamin B-3, mg
+            item.update(rda=16)
+        if id == 410: # Vitamin B-5, mg
+            item.update(rda=4)
+        if id == 415: # Vitamin B-6, mg
+            item.update(rda=1.3)
+            item.update(limit=100)
+        if id == 417: # Vitamin B-9, ug
+            item.update(rda=400)
+            item.update(limit=1000)
+        if id == 418: # Vitamin B-12, mg
+            item.update(rda=2.4)
+        if id == 421: # Choline, mg
+            item.update(rda=550)
+            item.update(limit=3500)
+        if id == 430: # Vitamin K, ug
+            item.update(rda=120)
+        # LIPIDS
+        if id == 601: # Cholesterol, mg
+            item.update(rda=None)
+            item.update(limit=300)
+        if id == 605: # Trans Fat, g
+            item.update(rda=None)
+            # avoid more than 5% of fat calories from trans fat
+            item.update(limit=(tdee/9)*(fat_p*0.05))
+        if id == 606: # Saturated Fat, g
+            item.update(rda=None)
+            item.update(limit=(tdee/9)*(fat_p*0.3))
+        if id == 621: # DHA, g
+            item.update(rda=0.5)
+        if id == 629: # EPA, g
+            item.update(rda=0.5)
+        if id == 645: # Monounsaturated Fat, g
+            item.update(rda=(tdee/9)*(fat_p*.40))
+        if id == 646: # Polyunsaturated Fat, g
+            item.update(rda=(tdee/9)*(fat_p*.30))
+        if id == 851: # ALA, g
+            item.update(rda=0.6)
+        if "limit" not in item.keys():
+            item.update(limit=None)
+
+    # Round values to avoid long decimals in rda values
+    for item in items:
+        if item["rda"] != None:
+            item["rda"] = round(item["rda"], 2)
+        if item["limit"] != None:
+            item["limit"] = round(item["limit"], 2)
+
+    # Adjust RDAs that depend on sex and age
+    adjustments = {}
+    if sex == "female":
+        adjustments.update(SEX_ADJUSTMENTS["female"])
+        if age is None or age <= 50:
+            adjustments.update({303: (18, 45)}) # Iron, mg
+    if age is not None:
+        for min_age, values in AGE_ADJUSTMENTS:
+            if age >= min_age:
+                adjustments.update(values.get(sex or "male", {}))
+    for item in items:
+        if item["nutrient_id"] in adjustments:
+            item["rda"], item["limit"] = adjustments[item["nutrient_id"]]
+    return items
+
+# nutrient_id -> (rda, limit) where the female DRI differs from the defaults above
+SEX_ADJUSTMENTS = {
+    "female": {
+        309: (8, 40),      # Zinc, mg
+        304: (310, 700),   # Magnesium, mg
+        318: (700, 20000), # Vitamin A
+        401: (75, 2000),   # Vitamin C, mg
+        404: (1.1, None),  # Vitamin B-1, mg
+        405: (1.1, None),  # Vitamin B-2, mg
+        406: (14, None),   # Vitamin B-3, mg
+        421: (425, 3500),  # Choline, mg
+        430: (90, None),   # Vitamin K, ug
+    },
+}
+
+# (minimum age, {sex: {nutrient_id: (rda, limit)}}), applied in order
+AGE_ADJUSTMENTS = [
+    (51, {"male": {415: (1.7, 100)},                        # Vitamin B-6, mg
+          "female": {415: (1.5, 100), 301: (1200, 2000)}}), # Calcium, mg
+    (71, {"male": {301: (1200, 2000), 324: (800, 8000)},    # Vitamin D
+          "female": {324: (800, 8000)}}),
+]
+
+def source_hash():
+    """sha1 of nutrient_ids.json, recorded in the precompiled table."""
+    import hashlib
+    with open(source_path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def compile_nutrient_dict():
+    """Build nutrient_dict from nutrient_ids.json with the default profile."""
+    import json
+    with open(source_path, encoding="utf-8") as f:
+        items = json.load(f)
+    return assign_rdas(items, tdee, protein_p, carb_p, fat_p, sugar_p)
+
+def write_table(path=table_path):
+    """Regenerate the precompiled table module at path."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# Generated by `python -m noms.build_table` from nutrient_ids.json. Do not edit.\n")
+        f.write("TABLE_VERSION = %r\n" % TABLE_VERSION)
+        f.write("SOURCE_SHA1 = %r\n" % source_hash())
+        f.write("PROFILE = %r\n" % (default_profile(),))
+        f.write("nutrient_dict = [\n")
+        for item in compile_nutrient_dict():
+            f.write("    %r,\n" % item)
+        f.write("]\n")
+
+def default_profile():
+    return (tdee, protein_p, carb_p, fat_p, sugar_p)
+
+def table_is_current(table, check_source=False):
+    """Whether a precompiled table matches this module. Hashing the JSON is
+    left to check_source so that imports only compare constants."""
+    if table.TABLE_VERSION != TABLE_VERSION or table.PROFILE != default_profile():
+        return False
+    return not check_source or table.SOURCE_SHA1 == source_hash()
+
+def _load_nutrient_dict():
+    try:
+        from . import _nutrient_table as table
+    except ImportError:
+        table = None
+    if table is not None and table_is_current(table):
+        return table.nutrient_dict
+    logging.getLogger(__name__).warning("precompiled nutrient table is missing or out of date, "
+                                        "run `python -m noms.build_table` to rebuild it")
+    return compile_nutrient_dict()
+
+nutrient_dict = _load_nutrient_dict()
+
+# Canonical nutrient order used by the value vectors of Food and Meal
+nutrient_ids = [nutrient["nutrient_id"] for nutrient in nutrient_dict]
+# FDC nutrient number (as a string, e.g. "203") -> column in those vectors
+column_from_number = {str(nutrient_id): i for i, nutrient_id in enumerate(nutrient_ids)}
+# name and nickname -> index, the first nutrient listed wins
+_index_from_name = {}
+for i, nutrient in enumerate(nutrient_dict):
+    _index_from_name.setdefault(nutrient["name"], i)
+    if "nickname" in nutrient:
+        _index_from_name.setdefault(nutrient["nickname"], i)
+
+def rda_limit_vectors(nutrients):
+    """Return read-only (rda, limit) float vectors for a nutrient_dict, with
+    NaN where the rda or limit is None. Vectors are cached per distinct set of
+    values, so personalized nutrient dicts are only converted once.
+    A NutrientProfile is accepted too and returns its compiled vectors.
+    """
+    if hasattr(nutrients, "rda_vector"):
+        return nutrients.rda_vector, nutrients.limit_vector
+    return _rda_limit_vectors(tuple((item["rda"], item["limit"]) for item in nutrients))
+
+@functools.lru_cache(maxsize=256)
+def _rda_limit_vectors(values):
+    rda = np.array([np.nan if r is None else r for r, _ in values], dtype=float)
+    limit = np.array([np.nan if l is None else l for _, l in values], dtype=float)
+    rda.flags.writeable = False
+    limit.flags.writeable = False
+    return rda, limit
+
+rda_vector, limit_vector = rda_limit_vectors(nutrient_dict)
+
@@ -0,0 +1,82 @@
+"""Per-user nutrient targets.
+A NutrientProfile describes one person's energy needs and macro split and
+compiles, once per distinct set of parameters, to the rda and limit vectors
+used by norm_rda, report and analyze. It can be passed anywhere a
+nutrient_dict is accepted.
+"""
+
+from dataclasses import dataclass
+import functools
+import types
+
+from .nutrient_dict import assign_rdas, nutrient_dict, rda_limit_vectors
+
+
+@dataclass(frozen=True)
+class NutrientProfile:
+    """Immutable nutrition profile.
+
+        tdee:: kcal per day
+        protein_p, carb_p, fat_p:: fraction of daily calories from each macro
+        sugar_p:: maximum fraction of daily calories from sugar
+        sex:: "male", "female" or None for the default (adult male) values
+        age:: years, or None
+        overrides:: optional mapping of nutrient_id -> (rda, limit), applied last
+    """
+    tdee: float = 2000
+    protein_p: float = 0.25
+    carb_p: float = 0.50
+    fat_p: float = 0.25
+    sugar_p: float = 0.10
+    sex: str = None
+    age: float = None
+    overrides: tuple = ()
+
+    def __post_init__(self):
+        assert self.sex in (None, "male", "female"), f"sex should be 'male', 'female' or None, not {self.sex}"
+        overrides = self.overrides
+        if isinstance(overrides, dict):
+            overrides = overrides.items()
+        # a sorted tuple keeps profiles hashable and equal regardless of order
+        object.__setattr__(self, 'overrides', tuple(sorted((int(k), tuple(v)) for k, v in overrides)))
+
+    @property
+    def nutrient_dict(self):
+        """Read-only nutrient dicts with this profile's rda and limit values."""
+        return _compile(self)[0]
+
+    @property
+    def rda_vector(self):
+        return _compile(self)[1]
+
+    @property
+    def limit_vector(self):
+        return _compile(self)[2]
+
+    # behave like a nutrient_dict for code that iterates over one
+    def __iter__(self):
+        return iter(self.nutrient_dict)
+
+    def __len__(self):
+        return len(self.nutrient_dict)
+
+    def __getitem__(self, i):
+        return self.nutrient_dict[i]
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile(profile):
+    items = [{k: v for k, v in item.items() if k not in ('rda', 'limit')}
+             for item in nutrient_dict]
+    assign_rdas(items, profile.tdee, profile.protein_p, profile.carb_p,
+                profile.fat_p, profile.sugar_p, profile.sex, profile.age)
+    overrides = dict(profile.overrides)
+    for item in items:
+        if item["nutrient_id"] in overrides:
+            item["rda"], item["limit"] = overrides[item["nutrient_id"]]
+    entries = tuple(types.MappingProxyType(item) for item in items)
+    rda, limit = rda_limit_vectors(items)
+    return entries, rda, limit
+
+
+DEFAULT_PROFILE = NutrientProfile()
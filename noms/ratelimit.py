@@ -0,0 +1,123 @@
+"""Rate limiting for the api.data.gov key that FoodData Central requires.
+Limits: https://api.data.gov/docs/rate-limits/
+"""
+
+import collections
+import threading
+import time
+
+HOUR = 3600
+DAY = 24 * 3600
+
+# Limits documented for api.data.gov keys. The headers on each response take
+# precedence once a request has been made.
+DEFAULT_HOURLY_LIMIT = 1000
+DEMO_KEY_HOURLY_LIMIT = 30
+DEMO_KEY_DAILY_LIMIT = 50
+
+
+def header_int(headers, name):
+    """Integer value of a response header, or None if it is missing or
+    not a number."""
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """Thread-safe token bucket that spreads requests evenly over the hourly
+    window instead of bursting until the quota is gone.
+
+        limit:: int, requests per window (updated from x-ratelimit-limit)
+        window:: float, seconds in the rate limit window
+        burst:: int, requests that may be sent back to back
+        daily_limit:: int, optional cap on requests per rolling 24 hours
+
+    Use RateLimiter.for_key() to share one limiter between every Client (and
+    thread) using the same API key.
+    """
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, limit=DEFAULT_HOURLY_LIMIT, window=HOUR, burst=10, daily_limit=None):
+        self.window = window
+        self.burst = burst
+        self.daily_limit = daily_limit
+        self._set_limit(limit)
+
+        self.tokens = float(self.capacity)
+        self.remaining = limit
+        self._updated = time.monotonic()
+        self._daily = collections.deque()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_key(cls, api_key):
+        """Return the process-wide limiter for an API key, creating it with
+        the documented limits on first use.
+        """
+        with cls._registry_lock:
+            if api_key not in cls._registry:
+                if api_key == "DEMO_KEY":
+                    cls._registry[api_key] = cls(DEMO_KEY_HOURLY_LIMIT, daily_limit=DEMO_KEY_DAILY_LIMIT)
+                else:
+                    cls._registry[api_key] = cls(DEFAULT_HOURLY_LIMIT)
+            return cls._registry[api_key]
+
+    def _set_limit(self, limit):
+        self.limit = limit
+        self.rate = limit / self.window
+        self.capacity = max(1, min(self.burst, limit))
+
+    @property
+    def interval(self):
+        """Seconds between requests at the steady-state rate."""
+        return 1 / self.rate
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self):
+        """Claim the next request slot and return how many seconds the caller
+        must wait before sending it. Callers queue in the order they reserve.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+            if self.daily_limit is not None:
+                while self._daily and self._daily[0] <= now - DAY:
+                    self._daily.popleft()
+                if len(self._daily) >= self.daily_limit:
+                    # the slot frees when the request daily_limit back ages out
+                    wait = max(wait, self._daily[-self.daily_limit] + DAY - now)
+                self._daily.append(now + wait)
+            return wait
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def update(self, headers):
+        """Synchronize with the x-ratelimit-* headers of a response."""
+        limit = header_int(headers, "x-ratelimit-limit")
+        remaining = header_int(headers, "x-ratelimit-remaining")
+        with self._lock:
+            if limit and limit != self.limit:
+                self._set_limit(limit)
+            if remaining is not None:
+                self.remaining = remaining
+                self._refill(time.monotonic())
+                # never believe there are more tokens than the server grants
+                self.tokens = min(self.tokens, self.remaining)
+
+    def __repr__(self):
+        return "<RateLimiter: %s requests per %ss, %s remaining>" % (self.limit, self.window, self.remaining)
@@ -1,53 +1,150 @@
+"""Nutrient reports: which nutrients of a meal are deficient, excessive or
+satisfactory for a NutrientProfile.
+
+classify() does this for a whole meals x nutrients matrix at once, and
+export_reports() streams the result for any number of meals to one CSV.
+"""
+
 import csv
-import sys
-from .nutrient_dict import *
+import gzip
+import itertools
+
+import numpy as np
+
+from .nutrient_dict import nutrient_dict, rda_limit_vectors
+from .profile import DEFAULT_PROFILE
+
+SATISFACTORY, DEFICIENT, EXCESSIVE = 0, 1, 2
+STATES = ["satisfactory", "deficient", "excessive"]
+
+REPORT_COLUMNS = ['meal', 'nutrient', 'unit', 'value', 'rda', 'limit', 'state']
+
+def classify(values, profile=None):
+    """Return state codes (SATISFACTORY, DEFICIENT or EXCESSIVE) with the
+    shape of values, a nutrient vector or a meals x nutrients matrix. A
+    missing rda is treated as 0 and a missing limit as no limit.
+    """
+    rda, limit = rda_limit_vectors(DEFAULT_PROFILE if profile is None else profile)
+    return _classify(np.asarray(values, dtype=float), rda, limit)
+
+def _classify(values, rda, limit):
+    rda = np.nan_to_num(rda, nan=0)
+    limit = np.nan_to_num(limit, nan=np.inf)
+    states = np.full(values.shape, SATISFACTORY, dtype=np.int8)
+    states[values > limit] = EXCESSIVE
+    states[values < rda] = DEFICIENT
+    return states
 
-def report(meal):
+def _is_single_profile(profile):
+    """True for a NutrientProfile or a plain nutrient_dict list, False for
+    an iterable of them."""
+    if hasattr(profile, "rda_vector"):
+        return True
+    return isinstance(profile, (list, tuple)) and len(profile) > 0 and isinstance(profile[0], dict)
+
+def report(meal, profile=None):
+    """Classify each nutrient of a meal as deficient, excessive or
+    satisfactory against a NutrientProfile (the module defaults if None)."""
+    profile = DEFAULT_PROFILE if profile is None else profile
+    states = classify(meal.vector, profile)
     report = []
-    for i in range(0, len(meal.nutrients)):
-        name = meal.nutrients[i]["name"]
-        rda = nutrient_dict[i]["rda"]
-        limit = nutrient_dict[i]["limit"]
-        value = meal.nutrients[i]["value"]
-        unit = meal.nutrients[i]["unit"]
-        state = ""
-        if rda == None:
-            rda = 0
-        if limit == None:
-            limit = sys.maxsize
-        if value < rda:
-            state = "deficient"
-        elif value > limit:
-            state = "excessive"
-        else:
-            state = "satisfactory"
-        if limit == sys.maxsize:
-            limit = None
-        report.append({"name":name, "rda":rda, "limit":limit, "value":value, "state":state, "unit":unit})
+    for i, nutrient in enumerate(meal.nutrients):
+        rda = profile[i]["rda"]
+        report.append({"name":nutrient["name"], "rda":0 if rda is None else rda, "limit":profile[i]["limit"],
+                       "value":nutrient["value"], "state":STATES[states[i]], "unit":nutrient["unit"]})
     return report
 
-def export_report(meal, path):
+def export_report(meal, path, profile=None):
+    """Write the report of one meal to a CSV. profile is a NutrientProfile
+    or a plain nutrient_dict list; the TDEE and macro ratio rows are left
+    blank for a list, which does not carry them."""
+    profile = DEFAULT_PROFILE if profile is None else profile
     with open(path, "w",newline='') as csvfile:
         writer = csv.writer(csvfile, delimiter=',')
         # Write profile information
-        writer.writerow(['TDEE',None,tdee])
-        writer.writerow(['Carb Ratio',carb_p,carb_p*tdee])
-        writer.writerow(['Protein Ratio',protein_p,protein_p*tdee])
-        writer.writerow(['Fat Ratio',fat_p,fat_p*tdee])
+        if hasattr(profile, "tdee"):
+            writer.writerow(['TDEE',None,profile.tdee])
+            writer.writerow(['Carb Ratio',profile.carb_p,profile.carb_p*profile.tdee])
+            writer.writerow(['Protein Ratio',profile.protein_p,profile.protein_p*profile.tdee])
+            writer.writerow(['Fat Ratio',profile.fat_p,profile.fat_p*profile.tdee])
+        else:
+            for name in ['TDEE', 'Carb Ratio', 'Protein Ratio', 'Fat Ratio']:
+                writer.writerow([name, None, None])
         writer.writerow([''])
         # Write nutritional information
         writer.writerow(['Nutrient', 'RDA', 'Limit'])
         for i in range(0, len(meal.nutrients)):
             name = meal.nutrients[i]["name"]
             row = [name]
-            if nutrient_dict[i]["rda"] == None:
+            if profile[i]["rda"] == None:
                 row.append("None")
             else:
-                row.append(nutrient_dict[i]["rda"])
-            if nutrient_dict[i]["limit"] == None:
+                row.append(profile[i]["rda"])
+            if profile[i]["limit"] == None:
                 row.append("None")
             else:
-                row.append(nutrient_dict[i]["limit"])
+                row.append(profile[i]["limit"])
             row.append(meal.nutrients[i]["value"])
-            i += 1
-            writer.writerow(row)
\ No newline at end of file
+            writer.writerow(row)
+
+def _open_report(path, compression):
+    if compression == "gzip" or (compression is None and path.endswith(".gz")):
+        return gzip.open(path, "wt", newline='', compresslevel=6)
+    return open(path, "w", newline='')
+
+def export_reports(meals, path, profile=None, labels=None, chunk_size=1024, compression=None):
+    """Write the report of every meal to one CSV, one row per meal and
+    nutrient with the columns in REPORT_COLUMNS. Meals are read and
+    classified chunk_size at a time, so memory use does not grow with the
+    number of meals.
+
+        meals:: iterable of Meal objects or nutrient vectors, or a
+        meals x nutrients matrix
+        profile:: NutrientProfile (or plain nutrient_dict list) for every
+        meal, or an iterable with one per meal. The defaults are used if None.
+        labels:: optional iterable naming each meal in the meal column,
+        e.g. user-day keys. Meals are numbered from 0 otherwise.
+        compression:: "gzip", or None to gzip only when path ends in .gz
+
+    Returns the number of meals written.
+    """
+    names = [nutrient.get("nickname", nutrient["name"]) for nutrient in nutrient_dict]
+    units = [nutrient["unit"] for nutrient in nutrient_dict]
+    if profile is None or _is_single_profile(profile):
+        profiles = itertools.repeat(DEFAULT_PROFILE if profile is None else profile)
+    else:
+        profiles = iter(profile)
+    labels = itertools.count() if labels is None else iter(labels)
+    meals = iter(meals)
+    count = 0
+    with _open_report(path, compression) as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_COLUMNS)
+        while True:
+            chunk = list(itertools.islice(meals, chunk_size))
+            if not chunk:
+                break
+            values = np.array([getattr(meal, "vector", meal) for meal in chunk], dtype=float)
+            values = values.reshape(len(chunk), len(nutrient_dict))
+            chunk_profiles = list(itertools.islice(profiles, len(chunk)))
+            if len(chunk_profiles) != len(chunk):
+                raise Exception("export_reports was given fewer profiles than meals")
+            # vectors and the rda and limit cells written to the CSV, per
+            # profile object (plain lists are unhashable, so keyed by id)
+            compiled = {}
+            for p in chunk_profiles:
+                if id(p) not in compiled:
+                    cells = [("" if n["rda"] is None else n["rda"], "" if n["limit"] is None else n["limit"])
+                             for n in p]
+                    compiled[id(p)] = rda_limit_vectors(p) + (cells,)
+            rda = np.array([compiled[id(p)][0] for p in chunk_profiles])
+            limit = np.array([compiled[id(p)][1] for p in chunk_profiles])
+            states = _classify(values, rda, limit)
+            for row_values, row_states, p in zip(values.tolist(), states.tolist(), chunk_profiles):
+                label = next(labels)
+                writer.writerows(
+                    [label, name, unit, value, rda, limit, STATES[state]]
+                    for name, unit, value, (rda, limit), state
+                    in zip(names, units, row_values, compiled[id(p)][2], row_states))
+            count += len(chunk)
+    return count
@@ -0,0 +1,136 @@
+"""Retry policy and circuit breaker shared by Client and AsyncClient.
+
+RetryPolicy decides whether and how long to wait before retrying a failed
+request: exponential backoff with full jitter, or the server's Retry-After
+on 429 and 503. CircuitBreaker stops sending requests for a while after
+consecutive failures, so callers fail fast during an FDC outage instead of
+each waiting through its own retries.
+"""
+
+import random
+import threading
+import time
+
+from .errors import CircuitOpenError
+
+# responses worth retrying: rate limiting and transient server errors.
+# None stands for a request that got no response (connection error, timeout).
+RETRY_STATUSES = frozenset([None, 429, 500, 502, 503, 504])
+# statuses whose Retry-After header is honoured
+RETRY_AFTER_STATUSES = frozenset([429, 503])
+# statuses that count as the API being down
+FAILURE_STATUSES = frozenset([None, 500, 502, 503, 504])
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or an HTTP
+    date), or None if it is missing or unreadable."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter.
+
+        max_attempts:: total tries per request, including the first
+        base:: seconds, backoff before the first retry is drawn from [0, base]
+        cap:: seconds, upper bound of any backoff
+        max_retry_after:: seconds. A Retry-After longer than this (e.g. an
+        exhausted hourly quota) is not waited out; the error is raised instead.
+    """
+    def __init__(self, max_attempts=4, base=0.5, cap=30.0, max_retry_after=60.0, seed=None):
+        self.max_attempts = max_attempts
+        self.base = base
+        self.cap = cap
+        self.max_retry_after = max_retry_after
+        self._random = random.Random(seed)
+
+    def backoff(self, attempt):
+        """Jittered delay before retry number attempt (1 for the first retry)."""
+        return self._random.uniform(0, min(self.cap, self.base * 2 ** (attempt - 1)))
+
+    def delay(self, attempt, status, retry_after=None):
+        """Seconds to wait before retry number attempt after a response with
+        status, or None if the request should not be retried."""
+        if attempt >= self.max_attempts or status not in RETRY_STATUSES:
+            return None
+        if status in RETRY_AFTER_STATUSES and retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            return retry_after
+        return self.backoff(attempt)
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+
+class CircuitBreaker:
+    """Fails requests fast after failure_threshold consecutive failures.
+    After reset_timeout seconds one trial request is let through; success
+    closes the circuit again, failure keeps it open for another timeout.
+    Thread-safe, and can be shared by several clients.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_request(self, endpoint=None):
+        """Raise CircuitOpenError unless a request may be sent now. Returns
+        True for the trial request of a half-open circuit."""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return False
+            if state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            remaining = max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+        raise CircuitOpenError("circuit open after %s consecutive failures, retry in %.0fs"
+                               % (self.failures, remaining), endpoint=endpoint)
+
+    def record(self, status, trial=False):
+        """Record the outcome of a request that was let through. trial is
+        what before_request returned for it."""
+        with self._lock:
+            if trial:
+                self._trial = False
+            if status in FAILURE_STATUSES:
+                self.failures += 1
+                if self.failures >= self.failure_threshold or self.opened_at is not None:
+                    self.opened_at = time.monotonic()
+            else:
+                self.failures = 0
+                self.opened_at = None
+
+    def release(self, trial):
+        """Give up a request without an outcome (e.g. it was cancelled). If it
+        was the half-open trial, the next request becomes the trial instead."""
+        if trial:
+            with self._lock:
+                self._trial = False
+
+    def __repr__(self):
+        return "<CircuitBreaker: %s, %s consecutive failures>" % (self.state, self.failures)
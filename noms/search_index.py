@@ -0,0 +1,168 @@
+"""Local search index over food descriptions.
+A client given a SearchIndex adds every food it sees to it, so keyword and
+substring queries over those foods can be answered without another
+/foods/search call.
+"""
+
+import collections
+import math
+import re
+import threading
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+def trigrams(text):
+    return {text[i:i+3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Token inverted index with a trigram index for substring matches.
+    Foods are added incrementally and ranked with BM25 over the description
+    tokens, with a bonus for descriptions that start with or equal the query.
+    Safe to share between threads.
+
+        max_foods:: optional bound on the number of foods indexed. Once it is
+        reached the food added or refreshed least recently is dropped.
+    """
+    def __init__(self, max_foods=None):
+        self.max_foods = max_foods
+        self.descriptions = {}  # fdcId -> description, least recently added first
+        self.data_types = {}    # fdcId -> dataType, when known
+        self._lower = {}
+        self._lengths = {}
+        self._counts = {}       # fdcId -> token counts
+        self._total_length = 0
+        self._tokens = collections.defaultdict(set)
+        self._trigrams = collections.defaultdict(set)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.descriptions)
+
+    def __contains__(self, fdcId):
+        return int(fdcId) in self.descriptions
+
+    def add(self, fdcId, description, dataType=None):
+        """Index a food. Re-adding a food with a new description replaces it."""
+        fdcId = int(fdcId)
+        with self._lock:
+            if dataType is not None:
+                self.data_types[fdcId] = dataType
+            if self.descriptions.get(fdcId) == description:
+                # move to the end of the eviction order
+                self.descriptions[fdcId] = self.descriptions.pop(fdcId)
+                return
+            if fdcId in self.descriptions:
+                self._remove(fdcId)
+            lower = description.lower()
+            tokens = tokenize(lower)
+            self.descriptions[fdcId] = description
+            self._lower[fdcId] = lower
+            self._lengths[fdcId] = len(tokens)
+            self._counts[fdcId] = collections.Counter(tokens)
+            self._total_length += len(tokens)
+            for token in tokens:
+                self._tokens[token].add(fdcId)
+            for gram in trigrams(lower):
+                self._trigrams[gram].add(fdcId)
+            if self.max_foods is not None:
+                while len(self.descriptions) > self.max_foods:
+                    oldest = next(iter(self.descriptions))
+                    self._remove(oldest)
+                    self.data_types.pop(oldest, None)
+
+    def _remove(self, fdcId):
+        lower = self._lower.pop(fdcId)
+        del self.descriptions[fdcId]
+        self._total_length -= self._lengths.pop(fdcId)
+        del self._counts[fdcId]
+        for token in tokenize(lower):
+            postings = self._tokens[token]
+            postings.discard(fdcId)
+            if not postings:
+                del self._tokens[token]
+        for gram in trigrams(lower):
+            postings = self._trigrams[gram]
+            postings.discard(fdcId)
+            if not postings:
+                del self._trigrams[gram]
+
+    def add_foods(self, foods):
+        """Index Food objects or raw food dicts from any endpoint."""
+        for food in foods:
+            if isinstance(food, dict):
+                self.add(food['fdcId'], food['description'], food.get('dataType'))
+            else:
+                self.add(food.id, food.description)
+
+    def _substring(self, text):
+        """Return the ids whose description contains text."""
+        grams = trigrams(text)
+        if not grams:
+            return {i for i, lower in self._lower.items() if text in lower}
+        postings = sorted((self._trigrams.get(g, set()) for g in grams), key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        return {i for i in candidates if text in self._lower[i]}
+
+    def search(self, query, exact=False, dataTypes=None):
+        """Return [{'description', 'fdcId'}] for the indexed foods matching
+        query, best match first.
+
+            exact:: bool, match query as a substring of the description (like
+            Client.foods_search(exact=True)) instead of by keywords
+            dataTypes:: optional list of DataType enums to filter on. Foods
+            whose dataType was never seen are kept.
+
+        Every keyword must match a whole token of the description, or failing
+        that a part of one, so "broc" still finds broccoli.
+        """
+        lower_query = query.lower().replace('description:', '').strip()
+        terms = tokenize(lower_query)
+        with self._lock:
+            if exact:
+                matches = self._substring(lower_query)
+            elif not terms:
+                matches = set()
+            else:
+                matches = None
+                for term in terms:
+                    ids = self._tokens.get(term) or self._substring(term)
+                    matches = set(ids) if matches is None else matches & ids
+                    if not matches:
+                        break
+
+            if dataTypes is not None:
+                allowed = {dt.value for dt in dataTypes}
+                matches = {i for i in matches if self.data_types.get(i, None) in allowed or i not in self.data_types}
+
+            n = len(self.descriptions)
+            avg_length = self._total_length / n if n else 0
+            idf = {t: math.log(1 + (n - len(self._tokens.get(t, ())) + 0.5) / (len(self._tokens.get(t, ())) + 0.5))
+                   for t in set(terms)}
+            scored = []
+            for i in matches:
+                lower = self._lower[i]
+                length = self._lengths[i]
+                counts = self._counts[i]
+                norm = K1 * (1 - B + B * length / avg_length)
+                score = 0.0
+                for t, weight in idf.items():
+                    tf = counts.get(t, 0)
+                    if tf:
+                        score += weight * tf * (K1 + 1) / (tf + norm)
+                if lower == lower_query:
+                    score += 10
+                elif lower.startswith(lower_query):
+                    score += 5
+                scored.append((-score, length, i))
+            scored.sort()
+            return [{'description': self.descriptions[i], 'fdcId': i} for _, _, i in scored]
@@ -0,0 +1,177 @@
+"""Columnar binary snapshot of a food catalogue.
+
+export_snapshot() writes the foods x nutrients matrix, the fdcIds,
+descriptions and portion tables as .npy files in one directory. Snapshot
+memory-maps them read-only, so every process on a host that opens the same
+snapshot shares one page-cache copy and opening it does not parse anything.
+Food and Meal objects built from a snapshot use rows of the mapped matrix
+as their vectors.
+
+    noms.export_snapshot(client.foods(pantry_ids, format=noms.Format.full), "pantry.snapshot")
+    snapshot = noms.Snapshot("pantry.snapshot")
+    meal = snapshot.meal([169228, 170379], grams=[150, 80])
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+from . import Food, Meal, Portion
+from .nutrient_dict import nutrient_ids
+
+SNAPSHOT_VERSION = 1
+
+# columns written by export_snapshot, loaded memory-mapped by Snapshot
+COLUMNS = ['ids', 'matrix', 'description_offsets', 'descriptions', 'portion_offsets',
+           'portion_weights', 'portion_amounts', 'portion_modifiers', 'portion_measures']
+
+
+def _offsets(lengths):
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def export_snapshot(foods, path):
+    """Write Food objects to a snapshot directory at path, replacing any
+    snapshot already there. Foods are stored in fdcId order; a repeated
+    fdcId keeps the last food given.
+
+        foods:: iterable of Food objects
+        path:: str, directory to write
+
+    Returns the number of foods written.
+    """
+    by_id = {int(food.id): food for food in foods}
+    ids = np.array(sorted(by_id), dtype=np.int64)
+    foods = [by_id[i] for i in ids.tolist()]
+
+    matrix = np.zeros((len(foods), len(nutrient_ids)))
+    for row, food in enumerate(foods):
+        matrix[row] = food.vector
+
+    descriptions = [food.description.encode('utf-8') for food in foods]
+
+    # modifier and measure strings repeat, so portions store codes into one table
+    strings = {}
+    def code(text):
+        if text is None:
+            return -1
+        return strings.setdefault(text, len(strings))
+
+    portions = [food.portions for food in foods]
+    flat = [p for food_portions in portions for p in food_portions]
+    columns = {
+        'ids': ids,
+        'matrix': matrix,
+        'description_offsets': _offsets([len(d) for d in descriptions]),
+        'descriptions': np.frombuffer(b''.join(descriptions), dtype=np.uint8),
+        'portion_offsets': _offsets([len(p) for p in portions]),
+        'portion_weights': np.array([p.weight for p in flat], dtype=float),
+        'portion_amounts': np.array([p.amount for p in flat], dtype=float),
+        'portion_modifiers': np.array([code(p.modifier) for p in flat], dtype=np.int32),
+        'portion_measures': np.array([code(p.measure) for p in flat], dtype=np.int32),
+    }
+    meta = {
+        'version': SNAPSHOT_VERSION,
+        'count': len(foods),
+        'nutrient_ids': nutrient_ids,
+        'strings': list(strings),
+    }
+
+    # build next to the destination and swap it in, so readers never see a
+    # partial snapshot
+    tmp = path.rstrip(os.sep) + '.tmp'
+    if os.path.exists(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+    for name, values in columns.items():
+        np.save(os.path.join(tmp, name + '.npy'), values)
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    if os.path.exists(path):
+        old = path.rstrip(os.sep) + '.old'
+        os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old)
+    else:
+        os.replace(tmp, path)
+    return len(foods)
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot written by export_snapshot."""
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['version'] != SNAPSHOT_VERSION:
+            raise Exception("snapshot %s has version %s, expected %s" % (path, meta['version'], SNAPSHOT_VERSION))
+        if meta['nutrient_ids'] != nutrient_ids:
+            raise Exception("snapshot %s was written for different nutrients, export it again" % path)
+        self._strings = meta['strings'] + [None] # measure code -1 is None
+        for name in COLUMNS:
+            setattr(self, name, np.load(os.path.join(path, name + '.npy'), mmap_mode='r'))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, fdcId):
+        return self._row(fdcId) is not None
+
+    def __iter__(self):
+        return (self._food(row) for row in range(len(self.ids)))
+
+    def _row(self, fdcId):
+        row = int(np.searchsorted(self.ids, int(fdcId)))
+        if row < len(self.ids) and self.ids[row] == int(fdcId):
+            return row
+        return None
+
+    def index(self, fdcIds):
+        """Return the matrix row of each fdcId. Raises KeyError for an fdcId
+        that is not in the snapshot."""
+        fdcIds = np.asarray(fdcIds, dtype=np.int64)
+        rows = np.searchsorted(self.ids, fdcIds)
+        found = rows < len(self.ids)
+        found[found] = self.ids[rows[found]] == fdcIds[found]
+        if not found.all():
+            raise KeyError("fdcIds %s are not in the snapshot" % fdcIds[~found].tolist())
+        return rows
+
+    def description(self, row):
+        start, end = self.description_offsets[row], self.description_offsets[row + 1]
+        return self.descriptions[start:end].tobytes().decode('utf-8')
+
+    def portions(self, row):
+        start, end = self.portion_offsets[row], self.portion_offsets[row + 1]
+        strings = self._strings
+        return [Portion.from_values(weight, strings[modifier], strings[measure], amount)
+                for weight, modifier, measure, amount in zip(
+                    self.portion_weights[start:end].tolist(), self.portion_modifiers[start:end].tolist(),
+                    self.portion_measures[start:end].tolist(), self.portion_amounts[start:end].tolist())]
+
+    def _food(self, row):
+        return Food.from_vector(int(self.ids[row]), self.description(row),
+                                self.matrix[row], self.portions(row))
+
+    def food(self, fdcId):
+        """Return a Food whose vector is a read-only view of its matrix row."""
+        row = self._row(fdcId)
+        if row is None:
+            raise KeyError("fdcId %s is not in the snapshot" % fdcId)
+        return self._food(row)
+
+    def foods(self, fdcIds: list):
+        """Return Foods for fdcIds, in the order given."""
+        return [self._food(row) for row in self.index(fdcIds).tolist()]
+
+    def rows(self, fdcIds: list):
+        """foods x nutrients matrix for fdcIds, e.g. as a pantry for analyze."""
+        return self.matrix[self.index(fdcIds)]
+
+    def meal(self, fdcIds: list, grams: list=None):
+        """Return a Meal of the foods for fdcIds."""
+        return Meal(self.foods(fdcIds), grams)
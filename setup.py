@@ -14,6 +14,14 @@ setuptools.setup(
     url="https://github.com/noahtren/noms",
     packages=setuptools.find_packages(),
     include_package_data=True,
+    install_requires=[
+        "numpy",
+        "requests",
+    ],
+    extras_require={
+        "async": ["aiohttp"],
+        "optimize": ["scipy"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
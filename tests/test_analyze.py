@@ -0,0 +1,74 @@
+"""Checks the vectorized norm_rda and analyze functions against outputs of
+the original list-of-dicts implementation, stored in
+fixtures/legacy_analyze.json for seeded synthetic foods."""
+import json
+import os
+
+import numpy as np
+import pytest
+
+import noms
+from noms import analyze
+from noms.nutrient_dict import nutrient_dict
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+@pytest.fixture(scope='module')
+def legacy():
+    with open(os.path.join(FIXTURES, 'legacy_analyze.json')) as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='module')
+def foods(legacy):
+    return [noms.Food.from_vector(i, 'Food %s' % i, vector) for i, vector in enumerate(legacy['vectors'])]
+
+
+@pytest.fixture
+def meal(legacy, foods):
+    return noms.Meal([foods[i] for i in legacy['meal']])
+
+
+def test_norm_rda_matrix_matches_legacy(legacy):
+    normed = noms.norm_rda(np.array(legacy['vectors']), nutrient_dict)
+    np.testing.assert_allclose(normed, legacy['food_norm_rda'])
+
+
+def test_norm_rda_dicts_match_legacy(legacy, foods):
+    for food, expected in zip(foods, legacy['food_norm_rda']):
+        assert [n['value'] for n in food.norm_rda(nutrient_dict)] == pytest.approx(expected)
+
+
+def test_meal_norm_rda_disp_matches_legacy(legacy, meal):
+    values = [n['value'] for n in meal.norm_rda(nutrient_dict, disp=True)]
+    assert values == pytest.approx(legacy['meal_norm_rda_disp'])
+
+
+def test_loss_and_removal_match_legacy(legacy, meal):
+    assert analyze.loss(meal, nutrient_dict) == pytest.approx(legacy['meal_loss'])
+    assert list(analyze.removal_losses(meal, nutrient_dict)) == pytest.approx(legacy['removal_losses'])
+    assert analyze.recommend_removal(meal, nutrient_dict) == legacy['recommend_removal']
+
+
+def test_recommendations_match_legacy(legacy, foods, meal):
+    pantry = foods[3:]
+    recommendations = analyze.generate_recommendations(meal, pantry, nutrient_dict, 5)
+    assert [r[1] for r in recommendations] == [r[1] for r in legacy['recommendations']]
+    for (loss, _, k), (old_loss, _, old_k) in zip(recommendations, legacy['recommendations']):
+        # the closed form finds the exact minimum the legacy solver converged towards
+        assert loss <= old_loss + 1e-9
+        assert loss == pytest.approx(old_loss, rel=1e-4)
+        assert k == pytest.approx(old_k, abs=1e-2)
+    matrix = analyze.generate_recommendations(meal, analyze.pantry_matrix(pantry), nutrient_dict, 5)
+    assert matrix == recommendations
+
+
+def test_incremental_meal_matches_rebuilt_meal(foods):
+    meal = noms.Meal(foods[:4], grams=[50, 100, 150, 200])
+    meal.remove(1)
+    meal.add(foods[5], 80)
+    rebuilt = noms.Meal([foods[0], foods[2], foods[3], foods[5]], grams=[50, 150, 200, 80])
+    np.testing.assert_allclose(meal.vector, rebuilt.vector)
+    np.testing.assert_allclose(analyze.removal_losses(meal, nutrient_dict),
+                               analyze.removal_losses(rebuilt, nutrient_dict))
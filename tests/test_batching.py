@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+import pytest
+
+import noms
+from noms.batching import AsyncFoodLoader, FoodLoader
+
+
+def fake_fetch(calls):
+    def fetch(fdcIds):
+        calls.append(list(fdcIds))
+        return [{'fdcId': int(i), 'description': 'Food %s' % i} for i in fdcIds if int(i) > 0]
+    return fetch
+
+
+def test_food_loader_coalesces_threads():
+    calls = []
+    loader = FoodLoader(fake_fetch(calls), window=0.05)
+    ids = [1, 2, 2, 3, 1, -1]
+    results = [None] * len(ids)
+
+    def load(i):
+        try:
+            results[i] = loader.load(ids[i])
+        except noms.NotFoundError as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=load, args=(i,)) for i in range(len(ids))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(calls[0]) == [-1, 1, 2, 3] and len(calls) == 1
+    assert [r['fdcId'] for r in results[:5]] == [1, 2, 2, 3, 1]
+    assert isinstance(results[5], noms.NotFoundError)
+
+
+def test_async_loader_cancelled_dispatch_fails_waiters():
+    started = asyncio.Event()
+
+    async def fetch(fdcIds):
+        started.set()
+        await asyncio.sleep(10)
+
+    async def main():
+        loader = AsyncFoodLoader(fetch, window=0)
+        waiters = [asyncio.ensure_future(loader.load(i)) for i in (1, 2)]
+        await started.wait()
+        for task in list(loader._tasks):
+            task.cancel()
+        done, pending = await asyncio.wait(waiters, timeout=1)
+        assert not pending
+        for waiter in done:
+            with pytest.raises(asyncio.CancelledError):
+                waiter.result()
+        assert not loader._in_flight
+
+    asyncio.run(main())
@@ -0,0 +1,29 @@
+import json
+import os
+import sys
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks')
+sys.path.insert(0, BENCHMARKS)
+
+import compute  # noqa: E402
+
+
+def test_save_and_compare(tmp_path):
+    path = str(tmp_path / 'baseline.json')
+    args = ['--sizes', '10', '--min-time', '0.001', '--repeat', '1']
+    assert compute.main(args + ['--only', 'norm_rda', '--save', path]) == 0
+    with open(path) as f:
+        saved = json.load(f)
+    assert set(saved['results']) == {'norm_rda[10]', 'Food.norm_rda[10]'}
+
+    saved['results']['norm_rda[10]']['items_per_second'] *= 1000
+    with open(path, 'w') as f:
+        json.dump(saved, f)
+    assert compute.main(args + ['--only', 'norm_rda', '--compare', path]) == 1
+
+
+def test_committed_baseline_covers_every_operation():
+    with open(os.path.join(BENCHMARKS, 'baseline.json')) as f:
+        baseline = json.load(f)
+    names = {name for name, _, _ in compute.operations(10, 0)}
+    assert {'%s[%d]' % (name, size) for name in names for size in compute.SIZES} == set(baseline['results'])
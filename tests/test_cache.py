@@ -0,0 +1,67 @@
+import types
+
+import pytest
+
+import noms
+from noms import cache as cache_module
+from noms.cache import ResponseCache
+from noms.fakeserver import FakeFDCServer
+from noms.ratelimit import RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(cache_module, 'time', types.SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(':memory:', ttl=60)
+    cache.set('/food/1', None, {'fdcId': 1})
+    clock.now += 59
+    assert cache.get('/food/1') == {'fdcId': 1}
+    clock.now += 2
+    assert cache.get('/food/1') is None
+    assert len(cache) == 0
+    assert cache.stats()['expired'] == 1
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache(':memory:', max_entries=2)
+    cache.set('/food/1', None, '1')
+    clock.now += 1
+    cache.set('/food/2', None, '2')
+    clock.now += 1
+    assert cache.get('/food/1') == 1
+    clock.now += 1
+    cache.set('/food/3', None, '3')
+    assert cache.get('/food/2') is None
+    assert cache.get('/food/1') == 1 and cache.get('/food/3') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_max_bytes_bounds_stored_bodies(clock):
+    cache = ResponseCache(':memory:', max_entries=None, max_bytes=10)
+    for i in range(5):
+        clock.now += 1
+        cache.set('/food/%s' % i, None, '"%s"' % ('x' * 2))
+    assert cache.stats()['bytes'] <= 10
+    assert cache.get('/food/4') == 'xx'
+    assert cache.get('/food/0') is None
+
+
+def test_key_ignores_payload_order():
+    assert ResponseCache.key('/foods', {'a': 1, 'b': 2}) == ResponseCache.key('/foods', {'b': 2, 'a': 1})
+
+
+def test_client_answers_repeat_lookups_from_cache(tmp_path):
+    foods = [{'fdcId': 1, 'description': 'Food', 'foodNutrients': []}]
+    with FakeFDCServer(foods) as server:
+        client = noms.Client("test", base_url=server.url, cache=str(tmp_path / 'cache.sqlite'),
+                             limiter=RateLimiter(10**6, burst=10**6))
+        assert client.food(1).id == 1
+        requests = server.stats['requests']
+        assert client.food(1).id == 1
+        assert server.stats['requests'] == requests
+        assert client.cache.stats()['hits'] == 1
@@ -0,0 +1,86 @@
+import pytest
+
+import noms
+from noms.fakeserver import FakeFDCServer
+from noms.ratelimit import RateLimiter
+
+
+def fake_client(server, **kwargs):
+    return noms.Client("test", base_url=server.url, limiter=RateLimiter(10**6, burst=10**6), **kwargs)
+
+
+def make_foods(n):
+    return [{'fdcId': 100000 + i, 'description': 'Food %s' % i, 'dataType': 'SR Legacy',
+             'foodNutrients': []} for i in range(n)]
+
+
+def test_iter_foods_walks_every_page():
+    with FakeFDCServer(make_foods(450)) as server:
+        client = fake_client(server)
+        assert len(list(client.iter_foods(dataTypes=[noms.DataType.SR]))) == 450
+
+
+def test_iter_foods_rejects_pages_larger_than_the_api_returns():
+    client = noms.Client("test")
+    with pytest.raises(ValueError):
+        next(client.iter_foods(pageSize=500))
+
+
+def test_iter_foods_memory_stays_flat():
+    import tracemalloc
+    with FakeFDCServer(make_foods(4000)) as server:
+        client = fake_client(server)
+        tracemalloc.start()
+        try:
+            for i, food in enumerate(client.iter_foods(dataTypes=[noms.DataType.SR])):
+                if i == 600:
+                    early = tracemalloc.get_traced_memory()[0]
+            late = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+    assert i == 3999
+    assert late - early < 256 * 1024
+
+
+def test_search_index_is_opt_in_and_bounded(monkeypatch):
+    monkeypatch.setattr(noms, 'LOCAL_INDEX_SIZE', 300)
+    with FakeFDCServer(make_foods(450)) as server:
+        client = fake_client(server)
+        assert client.search_index is None
+        with pytest.raises(ValueError):
+            client.foods_search("food", local=True)
+
+        client = fake_client(server, search_index=True)
+        for food in client.iter_foods(dataTypes=[noms.DataType.SR]):
+            pass
+        assert len(client.search_index) == 300
+        assert 100000 not in client.search_index and 100449 in client.search_index
+        assert client.foods_search("Food 449", local=True)[0]['fdcId'] == 100449
+
+
+def test_async_client_cache_and_local_search(tmp_path):
+    import asyncio
+    import threading
+    from noms.aio import AsyncClient
+
+    cache_threads = set()
+    class RecordingCache(noms.ResponseCache):
+        def get(self, *args):
+            cache_threads.add(threading.get_ident())
+            return super().get(*args)
+
+    async def run():
+        cache = RecordingCache(str(tmp_path / 'cache.sqlite'))
+        async with AsyncClient("test", cache=cache, base_url=server.url, search_index=True,
+                               limiter=RateLimiter(10**6, burst=10**6)) as client:
+            assert (await client.food(100003)).id == 100003
+            requests = server.stats['requests']
+            assert (await client.food(100003)).id == 100003
+            assert server.stats['requests'] == requests
+            assert await client.foods_search('food 3', local=True) == [
+                {'description': 'Food 3', 'fdcId': 100003}]
+        return threading.get_ident()
+
+    with FakeFDCServer(make_foods(5)) as server:
+        loop_thread = asyncio.run(run())
+    assert cache_threads and loop_thread not in cache_threads
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+import requests
+
+import noms
+from noms.fakeserver import FakeFDCServer
+from noms.ratelimit import RateLimiter
+from noms.retry import RetryPolicy
+
+
+def make_foods(n):
+    return [{'fdcId': 100000 + i, 'description': 'Food %s' % i,
+             'dataType': 'Branded' if i % 2 else 'SR Legacy',
+             'foodNutrients': [{'nutrient': {'id': 1003, 'number': '203', 'name': 'Protein', 'unitName': 'g'},
+                                'amount': i}]} for i in range(n)]
+
+
+def test_endpoints():
+    server = FakeFDCServer(make_foods(30))
+    status, food = server.handle('GET', '/food/100003', {}, {})
+    assert status == 200 and food['description'] == 'Food 3'
+    assert server.handle('GET', '/food/1', {}, {})[0] == 404
+
+    status, foods = server.handle('POST', '/foods', {}, {'fdcIds': [100001, 1, 100002]})
+    assert [f['fdcId'] for f in foods] == [100001, 100002]
+    assert server.handle('POST', '/foods', {}, {'fdcIds': list(range(21))})[0] == 400
+
+    status, page = server.handle('POST', '/foods/search', {},
+                                 {'query': 'food', 'dataType': ['SR Legacy'], 'pageSize': 10, 'pageNumber': 2})
+    assert (page['totalHits'], page['totalPages'], len(page['foods'])) == (15, 2, 5)
+    assert page['foods'][0]['foodNutrients'][0]['nutrientNumber'] == '203'
+
+    status, foods = server.handle('POST', '/foods/list', {}, {'pageSize': 25, 'pageNumber': 2})
+    assert [f['fdcId'] for f in foods] == [100025, 100026, 100027, 100028, 100029]
+
+
+def test_quota_headers_and_429():
+    with FakeFDCServer(make_foods(1), rate_limit=2) as server:
+        url = server.url + '/food/100000'
+        assert requests.get(url).status_code == 403
+        first = requests.get(url, params={'api_key': 'a'})
+        assert first.status_code == 200
+        assert first.headers['x-ratelimit-limit'] == '2'
+        assert first.headers['x-ratelimit-remaining'] == '1'
+        requests.get(url, params={'api_key': 'a'})
+        refused = requests.get(url, params={'api_key': 'a'})
+        assert refused.status_code == 429 and int(refused.headers['Retry-After']) > 0
+        # quotas are per key
+        assert requests.get(url, params={'api_key': 'b'}).status_code == 200
+        assert server.stats['throttled'] == 1
+        assert server.stats['endpoints'] == {'/food': 4}
+
+
+def test_client_retries_injected_429s():
+    with FakeFDCServer(make_foods(5), throttle_rate=0.5, retry_after=0, seed=1) as server:
+        client = noms.Client("test", base_url=server.url, limiter=RateLimiter(10**6, burst=10**6),
+                             retry=RetryPolicy(max_attempts=20, base=0.001, cap=0.001))
+        assert [f.id for f in client.foods([100000 + i for i in range(5)])] == [100000 + i for i in range(5)]
+        assert server.stats['throttled'] > 0
+
+
+def test_client_raises_once_quota_is_spent():
+    with FakeFDCServer(make_foods(1)) as server:
+        client = noms.Client("test", base_url=server.url, limiter=RateLimiter(10**6, burst=10**6))
+        server._quota["test"] = (time.monotonic(), server.rate_limit)
+        # the Retry-After of a spent hourly quota is too long to wait out
+        with pytest.raises(noms.RateLimitError):
+            client.food(100000)
+        assert server.stats['requests'] == 1
@@ -0,0 +1,62 @@
+import noms
+from noms.ingredients import match_portion
+
+
+def food_with_portions(*portions):
+    return noms.Food({
+        'fdcId': 1,
+        'description': 'Oil, olive',
+        'foodNutrients': [],
+        'foodPortions': list(portions),
+    })
+
+
+def test_match_portion_scales_by_portion_amount():
+    # FDC's gramWeight is the weight of `amount` units: 3 tbsp weigh 40.5 g
+    food = food_with_portions({'amount': 3, 'modifier': 'tbsp', 'gramWeight': 40.5})
+    portion, grams = match_portion(food, 1, 'tbsp')
+    assert portion.modifier == 'tbsp'
+    assert grams == 13.5
+    assert match_portion(food, 2, None)[1] == 27.0
+
+
+def test_match_portion_single_unit():
+    food = food_with_portions({'amount': 1, 'modifier': 'cup', 'gramWeight': 216})
+    assert match_portion(food, 0.5, 'cup')[1] == 108.0
+
+
+def test_resolution_memo_is_bounded(monkeypatch):
+    monkeypatch.setattr(noms, 'RESOLVE_MEMO_SIZE', 2)
+    client = noms.Client("test")
+    client._memo_set(client._resolutions, {'a': 1, 'b': 2})
+    client._memo_get(client._resolutions, ['a'])
+    client._memo_set(client._resolutions, {'c': None})
+    assert list(client._resolutions) == ['a', 'c']
+    assert client._memo_get(client._resolutions, ['a', 'b', 'c']) == {'a': 1, 'c': None}
+
+
+def test_resolutions_are_memoized_per_data_types():
+    from noms.fakeserver import FakeFDCServer
+    from noms.ratelimit import RateLimiter
+    foods = [
+        {'fdcId': 1, 'description': 'Broccoli, raw', 'dataType': 'SR Legacy', 'foodNutrients': []},
+        {'fdcId': 2, 'description': 'Broccoli', 'dataType': 'Branded', 'foodNutrients': []},
+    ]
+    with FakeFDCServer(foods) as server:
+        client = noms.Client("test", base_url=server.url, limiter=RateLimiter(10**6, burst=10**6))
+        assert client.resolve_ingredients(["1 cup broccoli"])[0]['fdcId'] == 1
+        branded = client.resolve_ingredients(["1 cup broccoli"], dataTypes=[noms.DataType.Branded])
+        assert branded[0]['fdcId'] == 2
+        requests = server.stats['requests']
+        assert client.resolve_ingredients(["1 cup broccoli"])[0]['fdcId'] == 1
+        assert server.stats['requests'] == requests
+
+
+def test_portion_unit_weight():
+    # "2 tbsp" weighing 27 g, through the packed portions of a Food
+    food = food_with_portions({'amount': 2, 'modifier': 'tbsp', 'gramWeight': 27})
+    portion = food.portions[0]
+    assert portion.gram_weight == 27
+    assert portion.unit_weight == 13.5
+    assert match_portion(food, 1, 'tbsp')[1] == 13.5
+    assert match_portion(food, 4, 'tbsp')[1] == 54
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+import noms
+from noms.local import LocalClient, import_fdc
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+@pytest.fixture(params=['fdc_csv', 'fdc.json'])
+def client(request, tmp_path):
+    path = str(tmp_path / 'fdc.sqlite')
+    assert import_fdc(os.path.join(FIXTURES, request.param), path) == 5
+    client = LocalClient(path)
+    yield client
+    client.close()
+
+
+def test_food(client):
+    food = client.food(171705)
+    assert food.description == 'Broccoli, raw'
+    assert food.vector[noms.nutrient_dict.index_from_name('Protein')] == 2.82
+    assert [p.modifier for p in food.portions] == ['cup chopped', 'tbsp']
+
+
+def test_food_not_found(client):
+    with pytest.raises(noms.NotFoundError):
+        client.food(1)
+
+
+def test_foods(client):
+    foods = client.foods([170379, 1, 169228])
+    assert [f.id for f in foods] == [170379, 169228]
+    assert [f.id for f in client.foods([169228], format=noms.Format.full)] == [169228]
+
+
+def test_foods_search(client):
+    results = client.foods_search('broccoli raw')
+    assert results == [{'description': 'Broccoli, raw', 'fdcId': 171705}]
+    assert len(client.foods_search('broccoli', getAll=True)) == 2
+
+
+def test_foods_search_brand_owner(client):
+    branded = [noms.DataType.Branded]
+    assert len(client.foods_search('broccoli', dataTypes=branded)) == 2
+    results = client.foods_search('broccoli', dataTypes=branded, brandOwner='birds eye')
+    assert results == [{'description': 'Broccoli florets', 'fdcId': 2001002}]
@@ -0,0 +1,78 @@
+import logging
+
+import noms
+from noms.fakeserver import FakeFDCServer
+from noms.metrics import Histogram, Hooks, endpoint_label
+from noms.ratelimit import RateLimiter
+from noms.retry import RetryPolicy
+
+FOODS = [{'fdcId': 100000 + i, 'description': 'Food %s' % i, 'foodNutrients': []} for i in range(3)]
+
+
+def metered_client(server, metrics, **kwargs):
+    return noms.Client("test", base_url=server.url, metrics=metrics,
+                       limiter=RateLimiter(10**6, burst=10**6), **kwargs)
+
+
+def test_histogram_is_cumulative():
+    histogram = Histogram((1, 10))
+    for value in (0.5, 1, 5, 50):
+        histogram.observe(value)
+    assert histogram.snapshot() == {'buckets': [(1, 2), (10, 3), (float('inf'), 4)], 'count': 4, 'sum': 56.5}
+
+
+def test_endpoint_label_drops_fdc_id():
+    assert endpoint_label('/food/169228') == '/food/{fdcId}'
+    assert endpoint_label('/foods/search') == '/foods/search'
+
+
+def test_client_reports_requests_quota_and_cache():
+    metrics = noms.Metrics()
+    with FakeFDCServer(FOODS, rate_limit=500) as server:
+        client = metered_client(server, metrics, cache=':memory:')
+        client.food(100000)
+        client.food(100000)
+        try:
+            client.food(1)
+        except noms.NotFoundError:
+            pass
+    snapshot = metrics.snapshot()
+    assert snapshot['latency']['/food/{fdcId}']['count'] == 2
+    assert {(r['status'], r['count']) for r in snapshot['responses']} == {(200, 1), (404, 1)}
+    assert snapshot['quota']['limit'] == 500
+    assert snapshot['quota']['remaining'] == 498
+    assert snapshot['cache']['/food/{fdcId}'] == {'hits': 1, 'misses': 2, 'hit_ratio': 1 / 3}
+
+    text = metrics.prometheus()
+    assert 'noms_responses_total{endpoint="/food/{fdcId}",status="404"} 1' in text
+    assert 'noms_ratelimit_remaining 498' in text
+
+
+def test_client_reports_retries_to_custom_hooks():
+    class Recorder(Hooks):
+        def __init__(self):
+            self.retries = []
+
+        def retry(self, endpoint, attempt, delay):
+            self.retries.append((endpoint, attempt))
+
+    hooks = Recorder()
+    with FakeFDCServer(FOODS, throttle_rate=0.5, retry_after=0, seed=3) as server:
+        client = metered_client(server, hooks, retry=RetryPolicy(max_attempts=20, base=0.001, cap=0.001))
+        for food in FOODS:
+            client.food(food['fdcId'])
+        assert len(hooks.retries) == server.stats['throttled'] > 0
+    assert all(endpoint == '/food/{fdcId}' for endpoint, _ in hooks.retries)
+
+
+def test_warnings_go_through_the_noms_logger(caplog):
+    with FakeFDCServer(FOODS) as server:
+        client = metered_client(server, None)
+        with caplog.at_level(logging.WARNING, logger='noms'):
+            try:
+                client.food(1)
+            except noms.NotFoundError:
+                pass
+    [record] = caplog.records
+    assert record.name == 'noms' and record.status == 404
+    assert record.getMessage() == 'response code 404 from GET /food/1'
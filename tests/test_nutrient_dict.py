@@ -0,0 +1,8 @@
+import noms
+import noms.nutrient_dict as nd
+
+
+def test_submodule_reachable_from_package():
+    assert noms.nutrient_dict is nd
+    assert nd.nutrient_dict[nd.index_from_name('Protein')]['name'] == 'Protein'
+    assert len(noms.Food.from_vector(1, 'x', [0] * len(nd.nutrient_dict)).nutrients) == len(nd.nutrient_dict)
@@ -0,0 +1,69 @@
+import dataclasses
+
+import numpy as np
+import pytest
+
+import noms
+from noms.nutrient_dict import index_from_name, nutrient_dict, rda_limit_vectors
+from noms.profile import _compile
+
+
+def bounds(profile, nutrient_id):
+    item = next(item for item in profile if item['nutrient_id'] == nutrient_id)
+    return item['rda'], item['limit']
+
+
+def test_default_profile_matches_default_nutrient_dict():
+    rda, limit = rda_limit_vectors(nutrient_dict)
+    np.testing.assert_array_equal(noms.DEFAULT_PROFILE.rda_vector, rda)
+    np.testing.assert_array_equal(noms.DEFAULT_PROFILE.limit_vector, limit)
+    assert [dict(item) for item in noms.DEFAULT_PROFILE] == nutrient_dict
+
+
+def test_macros_scale_with_tdee():
+    profile = noms.NutrientProfile(tdee=2400, protein_p=.3)
+    assert bounds(profile, 208) == (2400, None)        # Calories
+    assert bounds(profile, 203)[0] == 180              # Protein, 30% of 2400 kcal at 4 kcal/g
+    assert bounds(profile, 291)[0] == pytest.approx(33.6)  # Fiber, 14 g per 1000 kcal
+    assert bounds(profile, 269) == (None, 60)          # Sugar limit, 10% at 4 kcal/g
+
+
+def test_sex_and_age_adjustments():
+    assert bounds(noms.NutrientProfile(sex="female"), 303) == (18, 45)          # Iron
+    assert bounds(noms.NutrientProfile(sex="female", age=60), 303) == (8, 45)
+    assert bounds(noms.NutrientProfile(sex="female", age=60), 301) == (1200, 2000)  # Calcium
+    assert bounds(noms.NutrientProfile(age=75), 324) == (800, 8000)             # Vitamin D
+    assert bounds(noms.NutrientProfile(age=30), 301) == bounds(noms.DEFAULT_PROFILE, 301)
+    with pytest.raises(AssertionError):
+        noms.NutrientProfile(sex="other")
+
+
+def test_overrides_are_applied_last_and_order_free():
+    a = noms.NutrientProfile(overrides={303: (10, 40), 301: (900, None)})
+    b = noms.NutrientProfile(overrides=[(301, [900, None]), (303, (10, 40))])
+    assert a == b and hash(a) == hash(b)
+    assert bounds(a, 303) == (10, 40)
+
+
+def test_profiles_are_immutable_and_compiled_once():
+    profile = noms.NutrientProfile(tdee=1800)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        profile.tdee = 2000
+    with pytest.raises(TypeError):
+        profile[0]['rda'] = 1
+    with pytest.raises(ValueError):
+        profile.rda_vector[0] = 1
+    misses = _compile.cache_info().misses
+    assert noms.NutrientProfile(tdee=1800).rda_vector is profile.rda_vector
+    assert _compile.cache_info().misses == misses
+
+
+def test_profile_is_accepted_as_a_nutrient_dict():
+    profile = noms.NutrientProfile(tdee=4000)
+    protein = index_from_name('Protein')
+    vector = np.zeros(len(nutrient_dict))
+    vector[protein] = 125
+    assert noms.norm_rda(vector, nutrient_dict)[protein] == 1.0
+    assert noms.norm_rda(vector, profile)[protein] == 0.5
+    food = noms.Food.from_vector(1, 'Food', vector)
+    assert food.norm_rda(profile)[protein]['value'] == 0.5
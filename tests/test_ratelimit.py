@@ -0,0 +1,56 @@
+import threading
+import types
+
+import pytest
+
+from noms import ratelimit
+from noms.ratelimit import DAY, RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=0.0)
+    monkeypatch.setattr(ratelimit, 'time', types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_burst_then_steady_rate(clock):
+    limiter = RateLimiter(3600, burst=2)
+    assert [limiter.reserve() for _ in range(2)] == [0, 0]
+    # one token per second once the burst is spent, queued in order
+    assert limiter.reserve() == pytest.approx(1)
+    assert limiter.reserve() == pytest.approx(2)
+    clock.now += 10
+    assert limiter.reserve() == 0
+
+
+def test_headers_update_limit_and_remaining(clock):
+    limiter = RateLimiter(1000, burst=10)
+    limiter.update({'x-ratelimit-limit': '3600', 'x-ratelimit-remaining': '1'})
+    assert limiter.limit == 3600 and limiter.interval == pytest.approx(1)
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == pytest.approx(1)
+
+
+def test_demo_key_daily_limit(clock):
+    limiter = RateLimiter.for_key("DEMO_KEY")
+    assert limiter is RateLimiter.for_key("DEMO_KEY")
+    assert limiter.limit == ratelimit.DEMO_KEY_HOURLY_LIMIT
+
+    limiter = RateLimiter(10**6, burst=10**6, daily_limit=3)
+    assert [limiter.reserve() for _ in range(3)] == [0, 0, 0]
+    assert limiter.reserve() == pytest.approx(DAY)
+    clock.now += DAY + 1
+    assert limiter.reserve() == 0
+
+
+def test_reserve_is_thread_safe():
+    limiter = RateLimiter(3600, burst=1)
+    waits = []
+    threads = [threading.Thread(target=lambda: waits.append(limiter.reserve())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # every caller got its own slot, a second apart
+    assert sorted(round(w) for w in waits) == list(range(8))
@@ -0,0 +1,29 @@
+import csv
+
+import numpy as np
+
+import noms
+from noms.nutrient_dict import nutrient_dict
+from noms.report import DEFICIENT, classify, export_report, export_reports
+
+
+def test_plain_nutrient_dict_matches_profile(tmp_path):
+    meals = np.zeros((3, len(nutrient_dict)))
+    export_reports(meals, str(tmp_path / "profile.csv"), profile=noms.DEFAULT_PROFILE)
+    export_reports(meals, str(tmp_path / "list.csv"), profile=nutrient_dict)
+    export_reports(meals, str(tmp_path / "lists.csv"), profile=[nutrient_dict] * 3)
+    expected = (tmp_path / "profile.csv").read_text()
+    assert (tmp_path / "list.csv").read_text() == expected
+    assert (tmp_path / "lists.csv").read_text() == expected
+    assert (classify(meals, nutrient_dict) == classify(meals)).all()
+
+
+def test_export_report_accepts_plain_nutrient_dict(tmp_path):
+    meal = noms.Meal([noms.Food.from_vector(1, "x", np.zeros(len(nutrient_dict)))])
+    export_report(meal, str(tmp_path / "list.csv"), profile=nutrient_dict)
+    export_report(meal, str(tmp_path / "profile.csv"))
+    with open(tmp_path / "list.csv") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["TDEE", "", ""]
+    assert rows[6:] == list(csv.reader(open(tmp_path / "profile.csv")))[6:]
+    assert classify(meal.vector, nutrient_dict)[0] == DEFICIENT
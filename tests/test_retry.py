@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from noms.errors import CircuitOpenError
+from noms.retry import CircuitBreaker, RetryPolicy
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record(None)
+    time.sleep(0.02)
+    assert breaker.before_request() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    # a late result from a request sent before the circuit opened
+    breaker.record(None)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record(200, trial=True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_retry_delay():
+    policy = RetryPolicy(max_attempts=3, max_retry_after=60, seed=0)
+    assert policy.delay(1, 429, 2.0) == 2.0
+    assert policy.delay(1, 429, 3600.0) is None
+    assert 0 <= policy.delay(1, 503) <= policy.base
+    assert policy.delay(1, 404) is None
+    assert policy.delay(3, 500) is None
+
+
+def half_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record(None)
+    time.sleep(0.02)
+    return breaker
+
+
+def test_trial_raising_unexpected_exception_is_released(monkeypatch):
+    import noms
+    breaker = half_open_breaker()
+    client = noms.Client("test", breaker=breaker)
+
+    def broken_send(method, endpoint, data=None):
+        raise RuntimeError("bug")
+    monkeypatch.setattr(client, '_send', broken_send)
+    with pytest.raises(RuntimeError):
+        client.food(1)
+    assert breaker.before_request() is True
+
+
+def test_cancelled_trial_is_released():
+    import asyncio
+    import noms
+    from noms.fakeserver import FakeFDCServer
+    food = {'fdcId': 1, 'description': 'Food', 'foodNutrients': []}
+    breaker = half_open_breaker()
+
+    async def main(url):
+        async with noms.AsyncClient("test", base_url=url, breaker=breaker) as client:
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(client.food(1), 0.05)
+            assert breaker.state == CircuitBreaker.HALF_OPEN
+            server.latency = 0
+            assert (await client.food(1)).id == 1
+    with FakeFDCServer([food], latency=0.5) as server:
+        asyncio.run(main(server.url))
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_malformed_ratelimit_header():
+    from noms.ratelimit import RateLimiter, header_int
+    assert header_int({'x-ratelimit-remaining': 'n/a'}, 'x-ratelimit-remaining') is None
+    limiter = RateLimiter(100)
+    limiter.update({'x-ratelimit-limit': 'n/a', 'x-ratelimit-remaining': 'n/a'})
+    assert limiter.limit == 100
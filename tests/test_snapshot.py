@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+import noms
+
+
+def make_foods():
+    return [noms.Food({
+        'fdcId': fdcId,
+        'description': description,
+        'foodNutrients': [{'nutrient': {'number': '203'}, 'amount': protein},
+                          {'nutrient': {'number': '208'}, 'amount': protein * 10}],
+        'foodPortions': portions,
+    }) for fdcId, description, protein, portions in [
+        (170379, 'Broccoli, raw', 2.82, [{'amount': 1, 'modifier': 'cup chopped', 'gramWeight': 91},
+                                         {'amount': 2, 'modifier': 'tbsp', 'gramWeight': 11}]),
+        (169228, 'Crème fraîche', 2.4, []),
+        (171705, 'Oil, olive', 0.0, [{'amount': 1, 'modifier': 'tbsp', 'gramWeight': 13.5,
+                                      'measureUnit': {'name': 'tablespoon'}}]),
+    ]]
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = str(tmp_path / 'foods.snapshot')
+    assert noms.export_snapshot(make_foods(), path) == 3
+    return noms.Snapshot(path)
+
+
+def test_round_trip_matches_source_foods(snapshot):
+    foods = make_foods()
+    assert len(snapshot) == 3
+    assert snapshot.ids.tolist() == sorted(food.id for food in foods)
+    for food in foods:
+        loaded = snapshot.food(food.id)
+        np.testing.assert_array_equal(loaded.vector, food.vector)
+        assert loaded.description == food.description
+        assert [(p.weight, p.amount, p.modifier, p.measure) for p in loaded.portions] == \
+               [(p.weight, p.amount, p.modifier, p.measure) for p in food.portions]
+
+
+def test_matrix_is_memory_mapped_read_only(snapshot):
+    assert isinstance(snapshot.matrix, np.memmap)
+    food = snapshot.food(170379)
+    assert np.shares_memory(food.vector, snapshot.matrix)
+    with pytest.raises(ValueError):
+        food.vector[0] = 1
+
+
+def test_rows_and_meal_follow_requested_order(snapshot):
+    ids = [171705, 170379]
+    rows = snapshot.rows(ids)
+    np.testing.assert_array_equal(rows, [snapshot.food(i).vector for i in ids])
+    meal = snapshot.meal(ids, grams=[50, 200])
+    np.testing.assert_allclose(meal.vector, rows[0] * .5 + rows[1] * 2)
+    assert 169228 in snapshot and 1 not in snapshot
+    with pytest.raises(KeyError):
+        snapshot.rows([170379, 1])
+
+
+def test_export_replaces_existing_snapshot(tmp_path):
+    path = str(tmp_path / 'foods.snapshot')
+    noms.export_snapshot(make_foods(), path)
+    foods = make_foods()[:1]
+    assert noms.export_snapshot(foods + foods, path) == 1
+    assert noms.Snapshot(path).ids.tolist() == [170379]